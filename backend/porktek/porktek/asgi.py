@@ -3,6 +3,9 @@ ASGI config for porktek project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Sirva por aqui (uvicorn/daphne) o stream de resumo /api/lotes/ativo/stream/
+(porktekapp.stream); pelo WSGI ele responde 501.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
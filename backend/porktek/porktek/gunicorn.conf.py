@@ -0,0 +1,20 @@
+"""
+Configuração do gunicorn:
+
+    gunicorn -c porktek/gunicorn.conf.py porktek.wsgi
+
+Com preload_app o app é carregado uma vez no mestre; when_ready resolve URLconf
+e router antes do fork (ver porktek/preload.py).
+"""
+import os
+
+bind = os.environ.get('PORKTEK_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = True
+
+
+def when_ready(server):
+    from porktek.preload import aquecer
+
+    aquecer()
+    server.log.info('porktek: URLconf e router resolvidos antes do fork')
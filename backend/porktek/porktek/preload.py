@@ -0,0 +1,19 @@
+"""
+Aquecimento do app antes do fork dos workers (gunicorn com preload_app).
+
+Resolve o URLconf (que importa as views) e as rotas do router do DRF, para que os
+workers herdem tudo já pronto (copy-on-write) em vez de pagar por isso na
+primeira requisição de cada um.
+"""
+
+
+def aquecer():
+    from django.db import connections
+    from django.urls import get_resolver, resolve, reverse
+
+    get_resolver().url_patterns  # importa porktek.urls, views e o router
+    resolve('/api/lotes/')
+    reverse('lote-list')  # monta o índice de reverse
+
+    # conexões abertas no mestre não podem ser compartilhadas com os workers
+    connections.close_all()
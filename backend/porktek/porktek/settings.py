@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'porktekapp.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'porktekapp.middleware.ReplicaStickyMiddleware',
 ]
 
 ROOT_URLCONF = 'porktek.urls'
@@ -88,6 +91,22 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura opcional para resumos e listagens (ver porktekapp/db_router.py).
+# Para testar localmente, aponte para outro banco/host, ex.:
+#   PORKTEK_DB_REPLICA_HOST=localhost PORKTEK_DB_REPLICA_NAME=porktek-tcc python manage.py runserver
+if os.environ.get('PORKTEK_DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['PORKTEK_DB_REPLICA_HOST'],
+        'NAME': os.environ.get('PORKTEK_DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['porktekapp.db_router.ReplicaRouter']
+
+# Segundos em que o cliente que gravou continua lendo do banco principal
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -131,3 +150,32 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Django REST framework
+# FastJSONRenderer usa orjson quando instalado e cai no json da stdlib caso contrário
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'porktekapp.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Compressão das respostas (brotli se instalado, senão gzip)
+
+COMPRESSION_MIN_SIZE = 1024  # bytes; respostas menores saem sem compressão
+COMPRESSION_BROTLI_QUALITY = 5
+
+
+# Segundos que cada processo reaproveita o lote ativo sem consultar o banco
+LOTE_ATIVO_CACHE_TTL = 5
+
+# Segundos que cada processo reaproveita a lista de granjas (resolução do X-Granja)
+GRANJAS_CACHE_TTL = 5
+
+# Intervalo (s) do batimento do stream de resumo; também limita o atraso de
+# mudanças feitas por outros processos
+RESUMO_STREAM_HEARTBEAT = 15
+
+# Peso médio (kg) de abate usado pela projeção quando ?peso_alvo não é informado
+PESO_ABATE_ALVO = 120.0
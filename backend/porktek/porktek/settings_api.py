@@ -0,0 +1,41 @@
+"""
+Perfil somente API do porktek (pods da API com autoscaling).
+
+Sem admin, sessões, mensagens, arquivos estáticos e browsable API: menos apps
+para carregar no django.setup() e menos middleware por requisição.
+Use com DJANGO_SETTINGS_MODULE=porktek.settings_api.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if app not in (
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    )
+]
+
+# autenticação por sessão e CSRF não se aplicam sem sessões
+MIDDLEWARE = [
+    m for m in MIDDLEWARE
+    if m not in (
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    )
+]
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['porktekapp.renderers.FastJSONRenderer'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'UNAUTHENTICATED_USER': None,
+}
@@ -1,9 +1,11 @@
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from porktekapp.views import LoteViewSet, ChegadaViewSet, MorteViewSet, ObservacaoViewSet, RacaoEntradaViewSet, SaidaViewSet
+from porktekapp.stream import resumo_ativo_stream
+from porktekapp.views import GranjaViewSet, LoteViewSet, ChegadaViewSet, MorteViewSet, ObservacaoViewSet, RacaoEntradaViewSet, SaidaViewSet
 
 router = DefaultRouter()
+router.register(r'granjas', GranjaViewSet, basename='granja')
 router.register(r'lotes', LoteViewSet, basename='lote')
 router.register(r'chegadas', ChegadaViewSet, basename='chegada')
 router.register(r'mortes', MorteViewSet, basename='morte')
@@ -12,6 +14,12 @@ router.register(r'racoes', RacaoEntradaViewSet, basename='racoes')
 router.register(r'saidas', SaidaViewSet, basename='saidas')
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    path('api/lotes/ativo/stream/', resumo_ativo_stream, name='lote-ativo-stream'),
     path('api/', include(router.urls)),
 ]
+
+# o perfil somente API (porktek.settings_api) não instala o admin
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
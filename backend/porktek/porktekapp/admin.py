@@ -1,19 +1,61 @@
 from django.contrib import admin
-from .models import Lote, Chegada, Morte, Observacao
+from django.db import transaction
+from .models import Granja, Lote, Chegada, Morte, Observacao
+
+
+class ContadoresLoteAdmin(admin.ModelAdmin):
+    """
+    Eventos que mudam os contadores do lote (Lote.total_*). Pelo admin eles não
+    passam pelo EventoLoteSerializer: os contadores dos lotes afetados são
+    refeitos a cada gravação/exclusão, e lotes arquivados não aparecem na escolha.
+    """
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'lote':
+            kwargs['queryset'] = Lote.objects.filter(arquivado_em__isnull=True)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            # na edição o evento pode ter mudado de lote
+            self._recontar({obj.lote_id, form.initial.get('lote')})
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            self._recontar({obj.lote_id})
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            lote_ids = set(queryset.values_list('lote_id', flat=True))
+            super().delete_queryset(request, queryset)
+            self._recontar(lote_ids)
+
+    def _recontar(self, lote_ids):
+        for lote in Lote.objects.select_for_update().filter(pk__in=lote_ids - {None}):
+            lote.recontar()
+
+
+@admin.register(Granja)
+class GranjaAdmin(admin.ModelAdmin):
+    list_display = ('id','nome','criado_em')
+    search_fields = ('nome',)
 
 @admin.register(Lote)
 class LoteAdmin(admin.ModelAdmin):
-    list_display = ('id','nome','ativo','criado_em')
-    list_filter = ('ativo',)
+    list_display = ('id','granja','nome','ativo','criado_em')
+    list_filter = ('granja','ativo')
     search_fields = ('nome',)
+    readonly_fields = ('total_chegadas','total_mortes','total_saidas','primeira_chegada')
 
 @admin.register(Chegada)
-class ChegadaAdmin(admin.ModelAdmin):
+class ChegadaAdmin(ContadoresLoteAdmin):
     list_display = ('id','lote','data','quantidade','peso_medio','origem','responsavel','criado_em')
     list_filter = ('lote','data')
 
 @admin.register(Morte)
-class MorteAdmin(admin.ModelAdmin):
+class MorteAdmin(ContadoresLoteAdmin):
     list_display = ('id','lote','data_morte','causa','mossa','criado_em')
     list_filter = ('lote','data_morte')
 
@@ -0,0 +1,72 @@
+# porktekapp/arquivo.py
+import json
+import zlib
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Lote, LoteArquivo, Chegada, Morte, RacaoEntrada, Saida
+from .resumo import build_resumo_payload
+from .serializers import (
+    ChegadaSerializer, MorteSerializer, RacaoEntradaSerializer, SaidaSerializer,
+    serialize_values,
+)
+
+# chave no arquivo -> (modelo, serializer, ordenação da listagem)
+TABELAS = {
+    'chegadas': (Chegada, ChegadaSerializer, ('-data', '-id')),
+    'mortes': (Morte, MorteSerializer, ('-data_morte', '-id')),
+    'racoes': (RacaoEntrada, RacaoEntradaSerializer, ('-data', '-id')),
+    'saidas': (Saida, SaidaSerializer, ('-data', '-id')),
+}
+
+
+def _serializar(qs, serializer_class):
+    dados = serialize_values(qs, serializer_class)
+    return dados if dados is not None else serializer_class(qs, many=True).data
+
+
+def arquivar_lote(lote: Lote):
+    """
+    Congela o resumo do lote, grava seus eventos compactados em LoteArquivo e os
+    remove das tabelas quentes. O lote precisa estar finalizado.
+    """
+    with transaction.atomic():
+        lote = Lote.objects.select_for_update().get(pk=lote.pk)
+        if lote.ativo or lote.arquivado_em:
+            return False
+        resumo = build_resumo_payload(lote)
+        eventos = {
+            chave: _serializar(modelo.objects.filter(lote=lote).order_by(*ordem), serializer)
+            for chave, (modelo, serializer, ordem) in TABELAS.items()
+        }
+        blob = zlib.compress(json.dumps(eventos, separators=(',', ':')).encode(), 9)
+        LoteArquivo.objects.create(lote=lote, resumo=resumo, eventos=blob)
+        for modelo, _, _ in TABELAS.values():
+            modelo.objects.filter(lote=lote).delete()
+        lote.arquivado_em = timezone.now()
+        lote.save(update_fields=['arquivado_em'])
+    return True
+
+
+def eventos_arquivados(lote_id, chave):
+    """
+    Linhas arquivadas da tabela `chave` (no formato da API) ou None se o lote não
+    estiver arquivado. Uma consulta pela chave primária.
+    """
+    blob = LoteArquivo.objects.filter(lote_id=lote_id).values_list('eventos', flat=True).first()
+    if blob is None:
+        return None
+    return json.loads(zlib.decompress(blob))[chave]
+
+
+def eventos_do_lote(lote: Lote, chave):
+    """
+    Eventos do lote no formato da API, lidos do arquivo ou da tabela quente.
+    """
+    if lote.arquivado_em:
+        dados = eventos_arquivados(lote.pk, chave)
+        if dados is not None:
+            return dados
+    modelo, serializer, ordem = TABELAS[chave]
+    return _serializar(modelo.objects.filter(lote=lote).order_by(*ordem), serializer)
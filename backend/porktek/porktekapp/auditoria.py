@@ -0,0 +1,87 @@
+# porktekapp/auditoria.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.utils import timezone
+
+from .arquivo import TABELAS, eventos_do_lote
+from .models import HistoricoEvento
+
+_pendentes = ContextVar('porktek_historico_pendente', default=None)
+
+
+@contextmanager
+def registros_em_lote():
+    """
+    Acumula os registros de histórico do bloco e grava todos com um bulk_create
+    ao sair sem erro. Usar dentro do transaction.atomic() da escrita, para que
+    histórico e evento sejam gravados (ou desfeitos) juntos.
+    """
+    pendentes = []
+    token = _pendentes.set(pendentes)
+    try:
+        yield
+        if pendentes:
+            HistoricoEvento.objects.bulk_create(pendentes)
+    finally:
+        _pendentes.reset(token)
+
+
+def registrar(tabela, lote_id, objeto_id, acao, antes=None, depois=None, autor=''):
+    """
+    Registra uma criação (só `depois`), edição (ambos) ou exclusão (só `antes`).
+    Na edição guarda apenas os campos alterados; sem alteração, não registra.
+    """
+    if acao == 'U':
+        diff = {k: [antes.get(k), v] for k, v in depois.items() if antes.get(k) != v}
+        if not diff:
+            return
+    else:
+        diff = dict(depois if acao == 'C' else antes)
+    registro = HistoricoEvento(
+        lote_id=lote_id, tabela=tabela, objeto_id=objeto_id, acao=acao,
+        diff=diff, autor=autor[:120], criado_em=timezone.now(),
+    )
+    pendentes = _pendentes.get()
+    if pendentes is None:
+        registro.save()
+    else:
+        pendentes.append(registro)
+
+
+def historico_em(lote, em):
+    """
+    Eventos do lote como estavam no instante `em`: parte do estado atual (tabelas
+    quentes ou arquivo) e desfaz, do mais recente para o mais antigo, os registros
+    do log posteriores a `em`. Lê só o trecho do log depois de `em` (índice
+    lote_id, criado_em).
+    """
+    estado = {
+        chave: {row['id']: dict(row) for row in eventos_do_lote(lote, chave)}
+        for chave in TABELAS
+    }
+    posteriores = (
+        HistoricoEvento.objects.filter(lote_id=lote.pk, criado_em__gt=em)
+        .order_by('-criado_em', '-id')
+        .values_list('tabela', 'objeto_id', 'acao', 'diff')
+    )
+    for tabela, objeto_id, acao, diff in posteriores.iterator():
+        linhas = estado.get(tabela)
+        if linhas is None:
+            continue
+        if acao == 'C':
+            linhas.pop(objeto_id, None)
+        elif acao == 'D':
+            linhas[objeto_id] = dict(diff)
+        elif objeto_id in linhas:
+            for campo, (antes, _) in diff.items():
+                linhas[objeto_id][campo] = antes
+
+    resultado = {}
+    for chave, (_, _, ordem) in TABELAS.items():
+        linhas = list(estado[chave].values())
+        # mesma ordenação das listagens (campos com '-' são decrescentes)
+        for campo in reversed(ordem):
+            linhas.sort(key=lambda r: r[campo.lstrip('-')], reverse=campo.startswith('-'))
+        resultado[chave] = linhas
+    return resultado
@@ -0,0 +1,56 @@
+# porktekapp/broadcast.py
+import asyncio
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Lote
+
+
+class Broadcaster:
+    """
+    Difusão em processo: acorda as conexões de stream de uma granja quando um lote
+    dela (ou um evento do lote) muda. Seguro para chamar de threads síncronas.
+    """
+
+    def __init__(self):
+        self._assinantes = {}  # asyncio.Event -> (loop, granja_id)
+        self._lock = threading.Lock()
+
+    def assinar(self, granja_id):
+        evento = asyncio.Event()
+        with self._lock:
+            self._assinantes[evento] = (asyncio.get_running_loop(), granja_id)
+        return evento
+
+    def cancelar(self, evento):
+        with self._lock:
+            self._assinantes.pop(evento, None)
+
+    def publicar(self, granja_id):
+        with self._lock:
+            alvos = [(loop, ev) for ev, (loop, g) in self._assinantes.items() if g == granja_id]
+        for loop, evento in alvos:
+            try:
+                loop.call_soon_threadsafe(evento.set)
+            except RuntimeError:  # loop já encerrado
+                pass
+
+
+broadcaster = Broadcaster()
+
+
+def _publicar_lote(sender, instance, **kwargs):
+    # publica só após o commit, para que o resumo recalculado já veja a mudança
+    transaction.on_commit(lambda: broadcaster.publicar(instance.granja_id))
+
+
+def publicar_granja(granja_id):
+    transaction.on_commit(lambda: broadcaster.publicar(granja_id))
+
+
+# Eventos (chegadas, mortes...) publicam pelo GranjaMixin, que já conhece a granja;
+# sinais de post_delete neles desligariam o fast delete das exclusões em massa.
+post_save.connect(_publicar_lote, sender=Lote)
+post_delete.connect(_publicar_lote, sender=Lote)
@@ -0,0 +1,47 @@
+# porktekapp/db_router.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA = 'replica'
+# cookie que fixa as leituras no banco principal logo após uma escrita do cliente
+COOKIE_PRIMARIO = 'porktek_primario'
+
+_usar_replica = ContextVar('porktek_usar_replica', default=False)
+
+
+@contextmanager
+def leitura_replica():
+    """Dentro do bloco, leituras vão para a réplica (se configurada)."""
+    token = _usar_replica.set(True)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+
+def leitura_fixada_no_primario(request):
+    return COOKIE_PRIMARIO in request.COOKIES
+
+
+class ReplicaRouter:
+    """
+    Leituras marcadas com leitura_replica() vão para o alias 'replica'; todo o
+    resto (inclusive escritas e transações) fica no 'default'.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _usar_replica.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # réplica e principal têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
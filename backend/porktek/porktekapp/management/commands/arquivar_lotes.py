@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from porktekapp.arquivo import arquivar_lote
+from porktekapp.models import Lote
+
+
+class Command(BaseCommand):
+    help = 'Arquiva eventos de lotes finalizados há mais de N meses (resumo congelado, eventos compactados).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=12, help='Idade mínima da finalização, em meses.')
+        parser.add_argument('--dry-run', action='store_true', help='Só lista os lotes que seriam arquivados.')
+
+    def handle(self, *args, **options):
+        # mês comercial de 30 dias; precisão de dias não importa aqui
+        limite = timezone.now() - timedelta(days=30 * options['meses'])
+        lotes = Lote.objects.filter(
+            ativo=False, arquivado_em__isnull=True, finalizado_em__lt=limite
+        ).order_by('finalizado_em')
+
+        total = 0
+        for lote in lotes:
+            if options['dry_run']:
+                self.stdout.write(f'{lote.pk} {lote.nome} (finalizado em {lote.finalizado_em:%Y-%m-%d})')
+                continue
+            # um lote por transação: uma falha não desfaz os já arquivados
+            if arquivar_lote(lote):
+                total += 1
+                self.stdout.write(f'Arquivado: {lote.pk} {lote.nome}')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{total} lote(s) arquivado(s).'))
@@ -0,0 +1,168 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from porktekapp.models import Granja, Lote, Chegada, Morte, Observacao, RacaoEntrada, Saida
+from porktekapp.renderers import FastJSONRenderer, orjson
+from porktekapp.middleware import brotli
+from porktekapp.serializers import serialize_values
+from porktekapp.views import (
+    ChegadaViewSet, MorteViewSet, ObservacaoViewSet, RacaoEntradaViewSet, SaidaViewSet
+)
+
+# Executado em processo novo: o que um worker paga até atender a primeira requisição
+SCRIPT_STARTUP = '''
+import json, resource, time
+inicio = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver, resolve
+get_resolver().url_patterns
+resolve('/api/lotes/')
+print(json.dumps({
+    'setup_ms': (time.perf_counter() - inicio) * 1000,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+'''
+
+LIST_VIEWSETS = [
+    ('chegadas', ChegadaViewSet),
+    ('mortes', MorteViewSet),
+    ('observacoes', ObservacaoViewSet),
+    ('racoes', RacaoEntradaViewSet),
+    ('saidas', SaidaViewSet),
+]
+
+
+def _popular(n):
+    """
+    Cria um lote (finalizado) com n registros de cada evento. Usar dentro de
+    uma transação que será desfeita.
+    """
+    granja = Granja.objects.create(nome='benchmark')
+    lote = Lote.objects.create(granja=granja, nome='benchmark', ativo=False)
+    inicio = date(2024, 1, 1)
+    Chegada.objects.bulk_create(
+        Chegada(lote=lote, data=inicio + timedelta(days=i % 90), quantidade=100 + i % 50,
+                peso_medio=22.5 + (i % 7) * 0.1, peso_total=2250.0 + i, origem='Granja Exemplo',
+                idade_media_dias=60 + i % 10, responsavel='João', observacoes='')
+        for i in range(n)
+    )
+    Morte.objects.bulk_create(
+        Morte(lote=lote, data_morte=inicio + timedelta(days=i % 120), causa='Diarreia',
+              mossa=str(i), sexo='ND')
+        for i in range(n)
+    )
+    Observacao.objects.bulk_create(
+        Observacao(lote=lote, texto=f'Observação número {i}') for i in range(n)
+    )
+    RacaoEntrada.objects.bulk_create(
+        RacaoEntrada(lote=lote, tipo='FASE1', origem='Fábrica', quantidade=5000 + i,
+                     data=inicio + timedelta(days=i % 120))
+        for i in range(n)
+    )
+    Saida.objects.bulk_create(
+        Saida(lote=lote, quantidade=50 + i % 20, peso_total=6000.0 + i, peso_medio=120.125,
+              data=inicio + timedelta(days=100 + i % 30), observacoes='')
+        for i in range(n)
+    )
+    return lote
+
+
+def _cronometrar(fn, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = fn()
+    return (time.perf_counter() - inicio) / repeticoes, resultado
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks: payload (bytes e render das listagens), serializer (linhas/s) e '
+        'startup (tempo de inicialização e RSS por perfil de settings). Dados sintéticos, desfeitos ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', nargs='?', default='payload', choices=['payload', 'serializer', 'startup'])
+        parser.add_argument('--linhas', type=int, default=2000, help='Registros por tabela de evento.')
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument(
+            '--perfis', default='porktek.settings,porktek.settings_api',
+            help='Módulos de settings comparados na suite startup (separados por vírgula).'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            getattr(self, f'_suite_{options["suite"]}')(options)
+            transaction.set_rollback(True)
+
+    # ---------- bytes e tempo de render das listagens ----------
+    def _suite_payload(self, options):
+        lote = _popular(options['linhas'])
+        rep = options['repeticoes']
+        self.stdout.write(
+            f'orjson: {"sim" if orjson else "não"} | brotli: {"sim" if brotli else "não"} | '
+            f'{options["linhas"]} linhas por tabela'
+        )
+        self.stdout.write(
+            f'{"endpoint":<12} {"json ms":>9} {"rápido ms":>10} {"bytes":>10} {"gzip":>9} {"br":>9}'
+        )
+        for nome, viewset in LIST_VIEWSETS:
+            qs = viewset.queryset.filter(lote=lote)
+            data = viewset.serializer_class(qs, many=True).data
+            t_json, corpo = _cronometrar(lambda: JSONRenderer().render(data), rep)
+            t_rapido, corpo_rapido = _cronometrar(lambda: FastJSONRenderer().render(data), rep)
+            if corpo != corpo_rapido:
+                self.stderr.write(f'{nome}: saída do FastJSONRenderer difere do JSONRenderer')
+            tam_gzip = len(gzip.compress(corpo))
+            tam_br = len(brotli.compress(corpo, quality=5)) if brotli else '-'
+            self.stdout.write(
+                f'{nome:<12} {t_json * 1000:>9.2f} {t_rapido * 1000:>10.2f} '
+                f'{len(corpo):>10} {tam_gzip:>9} {tam_br:>9}'
+            )
+
+    # ---------- linhas/s: ModelSerializer x values_list ----------
+    def _suite_serializer(self, options):
+        lote = _popular(options['linhas'])
+        rep = options['repeticoes']
+        self.stdout.write(f'{options["linhas"]} linhas por tabela')
+        self.stdout.write(f'{"endpoint":<12} {"serializer l/s":>15} {"values l/s":>12} {"ganho":>7}')
+        for nome, viewset in LIST_VIEWSETS:
+            qs = viewset.queryset.filter(lote=lote)
+            t_ser, dados = _cronometrar(lambda: viewset.serializer_class(qs.all(), many=True).data, rep)
+            t_val, dados_val = _cronometrar(lambda: serialize_values(qs, viewset.serializer_class), rep)
+            if JSONRenderer().render(dados) != JSONRenderer().render(dados_val):
+                self.stderr.write(f'{nome}: saída do caminho rápido difere do serializer')
+            n = len(dados)
+            self.stdout.write(
+                f'{nome:<12} {n / t_ser:>15.0f} {n / t_val:>12.0f} {t_ser / t_val:>6.1f}x'
+            )
+
+    # ---------- inicialização e memória por perfil de settings ----------
+    def _suite_startup(self, options):
+        rep = options['repeticoes']
+        self.stdout.write(f'{"perfil":<26} {"processo ms":>12} {"setup ms":>9} {"RSS MB":>8}')
+        for perfil in options['perfis'].split(','):
+            env = {**os.environ, 'DJANGO_SETTINGS_MODULE': perfil}
+            total, setup, rss = 0.0, 0.0, 0
+            for _ in range(rep):
+                inicio = time.perf_counter()
+                saida = subprocess.run(
+                    [sys.executable, '-c', SCRIPT_STARTUP], env=env, check=True,
+                    capture_output=True, text=True,
+                )
+                total += time.perf_counter() - inicio
+                medida = json.loads(saida.stdout.strip().splitlines()[-1])
+                setup += medida['setup_ms']
+                rss = max(rss, medida['rss_kb'])
+            self.stdout.write(
+                f'{perfil:<26} {total / rep * 1000:>12.1f} {setup / rep:>9.1f} {rss / 1024:>8.1f}'
+            )
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from .db_router import COOKIE_PRIMARIO
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele só há gzip
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compressão negociada pelo Accept-Encoding: brotli (se instalado) ou gzip.
+
+    Respostas menores que settings.COMPRESSION_MIN_SIZE bytes saem sem compressão.
+    """
+
+    def process_response(self, request, response):
+        min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        # server-sent events precisam chegar ao cliente a cada mensagem
+        if response.streaming and response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+
+        ae = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or response.streaming or not re_accepts_br.search(ae):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+        compressed = brotli.compress(response.content, quality=quality)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class ReplicaStickyMiddleware:
+    """
+    Depois de uma escrita bem-sucedida, marca o cliente com um cookie por
+    REPLICA_STICKY_SECONDS segundos; enquanto ele existir, as leituras desse
+    cliente ficam no banco principal (lê o que acabou de gravar, sem atraso
+    de replicação).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.set_cookie(
+                COOKIE_PRIMARIO, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
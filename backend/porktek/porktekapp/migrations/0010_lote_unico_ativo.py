@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:53
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def finalizar_ativos_duplicados(apps, schema_editor):
+    # mantém só o lote ativo mais recente (é o que as telas já exibiam)
+    Lote = apps.get_model('porktekapp', 'Lote')
+    ativos = Lote.objects.filter(ativo=True).order_by('-criado_em', '-id')
+    duplicados = list(ativos.values_list('id', flat=True)[1:])
+    if duplicados:
+        Lote.objects.filter(id__in=duplicados).update(ativo=False, finalizado_em=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('porktekapp', '0009_chegada_idade_media_dias'),
+    ]
+
+    operations = [
+        migrations.RunPython(finalizar_ativos_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='lote',
+            constraint=models.UniqueConstraint(condition=models.Q(('ativo', True)), fields=('ativo',), name='unico_lote_ativo'),
+        ),
+    ]
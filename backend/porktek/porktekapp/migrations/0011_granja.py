@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def criar_granja_padrao(apps, schema_editor):
+    # lotes existentes passam a pertencer a uma granja padrão
+    Granja = apps.get_model('porktekapp', 'Granja')
+    Lote = apps.get_model('porktekapp', 'Lote')
+    granja = Granja.objects.order_by('id').first() or Granja.objects.create(nome='Granja principal')
+    Lote.objects.filter(granja__isnull=True).update(granja=granja)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('porktekapp', '0010_lote_unico_ativo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Granja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='granja',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lotes', to='porktekapp.granja'),
+        ),
+        migrations.RunPython(criar_granja_padrao, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='lote',
+            name='granja',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lotes', to='porktekapp.granja'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='lote',
+            name='unico_lote_ativo',
+        ),
+        migrations.AddConstraint(
+            model_name='lote',
+            constraint=models.UniqueConstraint(condition=models.Q(('ativo', True)), fields=('granja',), name='unico_lote_ativo_por_granja'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['granja', 'ativo', '-criado_em'], name='lote_granja_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['granja', '-finalizado_em'], name='lote_granja_finalizado_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('porktekapp', '0011_granja'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteArquivo',
+            fields=[
+                ('lote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='arquivo', serialize=False, to='porktekapp.lote')),
+                ('resumo', models.JSONField()),
+                ('eventos', models.BinaryField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='arquivado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('porktekapp', '0012_lote_arquivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurvaCrescimento',
+            fields=[
+                ('granja', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='curva', serialize=False, to='porktekapp.granja')),
+                ('lotes', models.PositiveIntegerField(default=0)),
+                ('soma_w', models.FloatField(default=0)),
+                ('soma_x', models.FloatField(default=0)),
+                ('soma_y', models.FloatField(default=0)),
+                ('soma_xx', models.FloatField(default=0)),
+                ('soma_xy', models.FloatField(default=0)),
+                ('racao_total', models.FloatField(default=0)),
+                ('ganho_total', models.FloatField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
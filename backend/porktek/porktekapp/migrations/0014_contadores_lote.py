@@ -0,0 +1,60 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:59
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def preencher_contadores(apps, schema_editor):
+    # lotes arquivados ficam zerados: não aceitam mais escritas de eventos
+    Lote = apps.get_model('porktekapp', 'Lote')
+    Chegada = apps.get_model('porktekapp', 'Chegada')
+    Morte = apps.get_model('porktekapp', 'Morte')
+    Saida = apps.get_model('porktekapp', 'Saida')
+    contadores = {}
+    for r in Chegada.objects.values('lote_id').annotate(q=Sum('quantidade'), d=Min('data')):
+        contadores.setdefault(r['lote_id'], {}).update(total_chegadas=r['q'] or 0, primeira_chegada=r['d'])
+    for r in Morte.objects.values('lote_id').annotate(q=Count('id')):
+        contadores.setdefault(r['lote_id'], {})['total_mortes'] = r['q']
+    for r in Saida.objects.values('lote_id').annotate(q=Sum('quantidade')):
+        contadores.setdefault(r['lote_id'], {})['total_saidas'] = r['q'] or 0
+    for lote_id, campos in contadores.items():
+        Lote.objects.filter(pk=lote_id).update(**campos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('porktekapp', '0013_curva_crescimento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lote',
+            name='primeira_chegada',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='total_chegadas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='total_mortes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='total_saidas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='chegada',
+            index=models.Index(fields=['lote', 'data'], name='chegada_lote_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='morte',
+            index=models.Index(fields=['lote', 'mossa'], name='morte_lote_mossa_idx'),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('porktekapp', '0014_contadores_lote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricoEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lote_id', models.BigIntegerField()),
+                ('tabela', models.CharField(max_length=10)),
+                ('objeto_id', models.BigIntegerField()),
+                ('acao', models.CharField(choices=[('C', 'Criação'), ('U', 'Edição'), ('D', 'Exclusão')], max_length=1)),
+                ('diff', models.JSONField()),
+                ('autor', models.CharField(blank=True, max_length=120)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lote_id', 'criado_em'], name='historico_lote_data_idx')],
+            },
+        ),
+    ]
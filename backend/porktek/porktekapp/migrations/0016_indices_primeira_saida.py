@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('porktekapp', '0015_historico_evento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='morte',
+            index=models.Index(fields=['lote', 'data_morte'], name='morte_lote_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saida',
+            index=models.Index(fields=['lote', 'data'], name='saida_lote_data_idx'),
+        ),
+    ]
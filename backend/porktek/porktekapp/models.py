@@ -1,14 +1,163 @@
-from django.db import models
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import Min, Sum
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+# Cache em processo do lote ativo de cada granja: {granja_id: (lote, expira)}.
+# 'geracao' muda a cada invalidação para que uma consulta em andamento não grave
+# um valor antigo depois de invalidado.
+_lote_ativo_cache = {'lotes': {}, 'geracao': 0}
+_lote_ativo_lock = threading.Lock()
+
+
+class LoteManager(models.Manager):
+    def ativo(self, granja):
+        """
+        Lote ativo atual da granja (ou None), cacheado em processo por
+        LOTE_ATIVO_CACHE_TTL segundos. O cache é invalidado a cada gravação/exclusão
+        de Lote; o TTL só limita o atraso visto por outros processos. Só leituras
+        do banco principal alimentam o cache: a réplica pode estar atrasada e o
+        valor serviria também a quem precisa ler o que acabou de gravar.
+        """
+        granja_id = getattr(granja, 'pk', granja)
+        agora = time.monotonic()
+        with _lote_ativo_lock:
+            lote, expira = _lote_ativo_cache['lotes'].get(granja_id, (None, 0.0))
+            if agora < expira:
+                return lote
+            geracao = _lote_ativo_cache['geracao']
+        lote = self.filter(granja_id=granja_id, ativo=True).order_by('-criado_em').first()
+        if self.db != DEFAULT_DB_ALIAS:
+            return lote
+        ttl = getattr(settings, 'LOTE_ATIVO_CACHE_TTL', 5)
+        with _lote_ativo_lock:
+            if _lote_ativo_cache['geracao'] == geracao:
+                _lote_ativo_cache['lotes'][granja_id] = (lote, agora + ttl)
+        return lote
+
+
+def invalidar_lote_ativo():
+    with _lote_ativo_lock:
+        _lote_ativo_cache['lotes'] = {}
+        _lote_ativo_cache['geracao'] += 1
+
+
+# Cache em processo das granjas cadastradas: {granja_id: Granja}, mesmo esquema do
+# cache do lote ativo.
+_granjas_cache = {'granjas': None, 'expira': 0.0, 'geracao': 0}
+_granjas_lock = threading.Lock()
+
+
+class GranjaManager(models.Manager):
+    def cadastradas(self):
+        """
+        {id: Granja} de todas as granjas, em ordem de id, cacheado em processo por
+        GRANJAS_CACHE_TTL segundos e invalidado a cada gravação/exclusão de Granja.
+        Só leituras do banco principal alimentam o cache.
+        """
+        agora = time.monotonic()
+        with _granjas_lock:
+            if _granjas_cache['granjas'] is not None and agora < _granjas_cache['expira']:
+                return _granjas_cache['granjas']
+            geracao = _granjas_cache['geracao']
+        granjas = {g.pk: g for g in self.order_by('id')}
+        if self.db != DEFAULT_DB_ALIAS:
+            return granjas
+        ttl = getattr(settings, 'GRANJAS_CACHE_TTL', 5)
+        with _granjas_lock:
+            if _granjas_cache['geracao'] == geracao:
+                _granjas_cache.update(granjas=granjas, expira=agora + ttl)
+        return granjas
+
+
+def invalidar_granjas():
+    with _granjas_lock:
+        _granjas_cache['granjas'] = None
+        _granjas_cache['geracao'] += 1
+
+
+class Granja(models.Model):
+    nome = models.CharField(max_length=100)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    objects = GranjaManager()
+
+    def __str__(self):
+        return self.nome
+
+
+def _granja_alterada(sender, **kwargs):
+    invalidar_granjas()
+    transaction.on_commit(invalidar_granjas)
+
+
+post_save.connect(_granja_alterada, sender=Granja)
+post_delete.connect(_granja_alterada, sender=Granja)
+
 
 class Lote(models.Model):
+    granja = models.ForeignKey(Granja, on_delete=models.PROTECT, related_name='lotes')
     nome = models.CharField(max_length=100)
     ativo = models.BooleanField(default=True)
     finalizado_em = models.DateTimeField(null=True, blank=True)
+    arquivado_em = models.DateTimeField(null=True, blank=True)
     criado_em = models.DateTimeField(auto_now_add=True)
 
+    # contadores mantidos pelas escritas de eventos (ver EventoLoteSerializer e recontar)
+    total_chegadas = models.PositiveIntegerField(default=0)
+    total_mortes = models.PositiveIntegerField(default=0)
+    total_saidas = models.PositiveIntegerField(default=0)
+    primeira_chegada = models.DateField(null=True, blank=True)
+
+    objects = LoteManager()
+
+    class Meta:
+        constraints = [
+            # no máximo um lote ativo por granja
+            models.UniqueConstraint(fields=['granja'], condition=models.Q(ativo=True), name='unico_lote_ativo_por_granja'),
+        ]
+        indexes = [
+            # consultas sempre filtram pela granja primeiro
+            models.Index(fields=['granja', 'ativo', '-criado_em'], name='lote_granja_ativo_idx'),
+            models.Index(fields=['granja', '-finalizado_em'], name='lote_granja_finalizado_idx'),
+        ]
+
     def __str__(self):
         return self.nome
 
+    def suinos_vivos(self):
+        return self.total_chegadas - self.total_mortes - self.total_saidas
+
+    def recontar(self):
+        """
+        Refaz os contadores a partir das tabelas de eventos. Para escritas que não
+        passam pelo EventoLoteSerializer (ex.: admin); custa O(eventos do lote).
+        """
+        chegadas = Chegada.objects.filter(lote=self).aggregate(q=Sum('quantidade'), d=Min('data'))
+        self.total_chegadas = chegadas['q'] or 0
+        self.primeira_chegada = chegadas['d']
+        self.total_mortes = Morte.objects.filter(lote=self).count()
+        self.total_saidas = Saida.objects.filter(lote=self).aggregate(q=Sum('quantidade'))['q'] or 0
+        # update() direto, como nas escritas da API: não dispara sinais de Lote
+        Lote.objects.filter(pk=self.pk).update(
+            total_chegadas=self.total_chegadas, primeira_chegada=self.primeira_chegada,
+            total_mortes=self.total_mortes, total_saidas=self.total_saidas,
+        )
+
+
+def _lote_alterado(sender, **kwargs):
+    # invalida já e de novo no commit, para não reaproveitar um valor lido antes dele
+    invalidar_lote_ativo()
+    transaction.on_commit(invalidar_lote_ativo)
+
+
+post_save.connect(_lote_alterado, sender=Lote)
+post_delete.connect(_lote_alterado, sender=Lote)
+
 class Chegada(models.Model):
     lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='chegadas')
     data = models.DateField()
@@ -21,6 +170,11 @@ class Chegada(models.Model):
     observacoes = models.TextField(blank=True)
     criado_em = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['lote', 'data'], name='chegada_lote_data_idx'),
+        ]
+
 class Morte(models.Model):
     SEXO_CHOICES = [
         ('M', 'Macho'),
@@ -34,6 +188,13 @@ class Morte(models.Model):
     sexo = models.CharField(max_length=2, choices=SEXO_CHOICES, default='ND')
     criado_em = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['lote', 'mossa'], name='morte_lote_mossa_idx'),
+            # primeira morte do lote (ver ChegadaSerializer)
+            models.Index(fields=['lote', 'data_morte'], name='morte_lote_data_idx'),
+        ]
+
 class Observacao(models.Model):
     lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='observacoes')
     texto = models.TextField()
@@ -64,5 +225,68 @@ class Saida(models.Model):
     data = models.DateField()
     observacoes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # primeira saída do lote (ver ChegadaSerializer)
+            models.Index(fields=['lote', 'data'], name='saida_lote_data_idx'),
+        ]
+
     def __str__(self):
         return f'Saída {self.quantidade} suínos - {self.data}'
+
+
+class LoteArquivo(models.Model):
+    """
+    Lote finalizado arquivado: resumo congelado e eventos (chegadas, mortes,
+    rações e saídas) em JSON compactado com zlib, fora das tabelas quentes.
+    """
+    lote = models.OneToOneField(Lote, on_delete=models.CASCADE, primary_key=True, related_name='arquivo')
+    resumo = models.JSONField()
+    eventos = models.BinaryField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+
+class CurvaCrescimento(models.Model):
+    """
+    Somas do ajuste peso = a * idade^b (mínimos quadrados em log-log, ponderado
+    pela quantidade de suínos) sobre os lotes finalizados da granja, mais ração e
+    ganho de peso acumulados. Atualizadas de forma incremental a cada lote
+    finalizado; ver porktekapp/projecao.py.
+    """
+    granja = models.OneToOneField(Granja, on_delete=models.CASCADE, primary_key=True, related_name='curva')
+    lotes = models.PositiveIntegerField(default=0)
+    soma_w = models.FloatField(default=0)
+    soma_x = models.FloatField(default=0)
+    soma_y = models.FloatField(default=0)
+    soma_xx = models.FloatField(default=0)
+    soma_xy = models.FloatField(default=0)
+    racao_total = models.FloatField(default=0)
+    ganho_total = models.FloatField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+
+class HistoricoEvento(models.Model):
+    """
+    Log append-only das alterações em chegadas, mortes, rações e saídas.
+    `diff` guarda o registro inteiro na criação e na exclusão e, na edição, só os
+    campos alterados como [antes, depois]. lote_id não é FK para o histórico
+    sobreviver à exclusão do lote.
+    """
+    ACAO_CHOICES = [
+        ('C', 'Criação'),
+        ('U', 'Edição'),
+        ('D', 'Exclusão'),
+    ]
+    lote_id = models.BigIntegerField()
+    tabela = models.CharField(max_length=10)  # chave de arquivo.TABELAS
+    objeto_id = models.BigIntegerField()
+    acao = models.CharField(max_length=1, choices=ACAO_CHOICES)
+    diff = models.JSONField()
+    autor = models.CharField(max_length=120, blank=True)
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # histórico de um lote a partir de um instante, sem varrer o log
+            models.Index(fields=['lote_id', 'criado_em'], name='historico_lote_data_idx'),
+        ]
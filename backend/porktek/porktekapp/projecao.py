@@ -0,0 +1,207 @@
+# porktekapp/projecao.py
+"""
+Projeção de crescimento por lote.
+
+Curva peso = a * idade^b ajustada por mínimos quadrados em log-log sobre os lotes
+finalizados da granja: pontos (idade média, peso médio) de cada chegada e de cada
+saída, ponderados pela quantidade de suínos. As somas do ajuste ficam em
+CurvaCrescimento e recebem cada lote finalizado sem refazer o histórico.
+"""
+import math
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F
+
+from .arquivo import eventos_do_lote
+from .models import CurvaCrescimento, Granja, Lote
+
+SOMAS = ('soma_w', 'soma_x', 'soma_y', 'soma_xx', 'soma_xy', 'racao_total', 'ganho_total')
+# tabelas de eventos que entram nas somas da curva
+TABELAS_DA_CURVA = ('chegadas', 'saidas', 'racoes')
+
+
+# ----------------- dados de um lote -----------------
+
+def _media_ponderada(pares):
+    """pares (valor, peso) -> média ponderada ou None."""
+    soma_w = sum(w for _, w in pares)
+    return sum(v * w for v, w in pares) / soma_w if soma_w > 0 else None
+
+
+def _chegada_media(chegadas):
+    """
+    (data média, idade média em dias, peso médio) das chegadas, ponderados pela
+    quantidade. Itens ficam None quando faltam dados.
+    """
+    com_qtd = [c for c in chegadas if c['quantidade']]
+    if not com_qtd:
+        return None, None, None
+    ordinal = _media_ponderada([(date.fromisoformat(c['data']).toordinal(), c['quantidade']) for c in com_qtd])
+    idade = _media_ponderada([(c['idade_media_dias'], c['quantidade']) for c in com_qtd if c['idade_media_dias']])
+    peso = _media_ponderada([(c['peso_medio'], c['quantidade']) for c in com_qtd if c['peso_medio']])
+    return date.fromordinal(round(ordinal)), idade, peso
+
+
+def _peso_saida(s):
+    if s['peso_medio']:
+        return s['peso_medio']
+    return s['peso_total'] / s['quantidade'] if s['peso_total'] and s['quantidade'] else None
+
+
+def _somas_do_lote(lote):
+    """Contribuição de um lote finalizado para as somas da curva."""
+    chegadas = eventos_do_lote(lote, 'chegadas')
+    saidas = eventos_do_lote(lote, 'saidas')
+    racoes = eventos_do_lote(lote, 'racoes')
+    somas = dict.fromkeys(SOMAS, 0.0)
+
+    data_ref, idade_ref, _ = _chegada_media(chegadas)
+    pontos = [(c['idade_media_dias'], c['peso_medio'], c['quantidade']) for c in chegadas]
+    if idade_ref is not None:
+        for s in saidas:
+            idade = idade_ref + (date.fromisoformat(s['data']) - data_ref).days
+            pontos.append((idade, _peso_saida(s), s['quantidade']))
+    for idade, peso, w in pontos:
+        if idade and peso and w and idade > 0 and peso > 0:
+            x, y = math.log(idade), math.log(peso)
+            somas['soma_w'] += w
+            somas['soma_x'] += w * x
+            somas['soma_y'] += w * y
+            somas['soma_xx'] += w * x * x
+            somas['soma_xy'] += w * x * y
+
+    # conversão alimentar: só lotes com ração e ganho de peso registrados
+    peso_chegada = sum(c['peso_total'] if c['peso_total'] is not None else c['quantidade'] * c['peso_medio']
+                       for c in chegadas)
+    ganho = sum(s['peso_total'] or 0 for s in saidas) - peso_chegada
+    racao = sum(r['quantidade'] for r in racoes)
+    if ganho > 0 and racao > 0:
+        somas['racao_total'] = float(racao)
+        somas['ganho_total'] = float(ganho)
+    return somas
+
+
+# ----------------- curva por granja -----------------
+#
+# Quem cria, soma ou descarta a curva trava antes a linha da Granja: a curva pode
+# ainda não existir, e sem a trava uma construção sob demanda concorrente com a
+# finalização de um lote contaria esse lote duas vezes.
+
+def _travar_granja(granja_id):
+    Granja.objects.select_for_update().filter(pk=granja_id).exists()
+
+
+def recalcular_curva(granja_id):
+    """Refaz as somas da granja a partir de todos os lotes finalizados."""
+    lotes = Lote.objects.filter(granja_id=granja_id, ativo=False)
+    total = dict.fromkeys(SOMAS, 0.0)
+    n = 0
+    for lote in lotes:
+        for k, v in _somas_do_lote(lote).items():
+            total[k] += v
+        n += 1
+    curva, _ = CurvaCrescimento.objects.update_or_create(granja_id=granja_id, defaults={'lotes': n, **total})
+    return curva
+
+
+def incorporar_lote(lote):
+    """
+    Soma um lote recém-finalizado à curva da granja. Sem curva ainda, calcula a
+    partir do histórico (que já inclui o lote). Chamar na mesma transação que
+    finaliza o lote.
+    """
+    with transaction.atomic():
+        _travar_granja(lote.granja_id)
+        if not CurvaCrescimento.objects.filter(granja_id=lote.granja_id).exists():
+            recalcular_curva(lote.granja_id)
+            return
+        somas = _somas_do_lote(lote)
+        CurvaCrescimento.objects.filter(granja_id=lote.granja_id).update(
+            lotes=F('lotes') + 1, **{k: F(k) + v for k, v in somas.items()}
+        )
+
+
+def descartar_curva(granja_id):
+    """
+    Invalida a curva (ex.: lote finalizado excluído ou evento de lote finalizado
+    alterado); refeita na próxima projeção.
+    """
+    with transaction.atomic():
+        _travar_granja(granja_id)
+        CurvaCrescimento.objects.filter(granja_id=granja_id).delete()
+
+
+def _curva(granja_id):
+    """Curva da granja, construída a partir do histórico se ainda não existir."""
+    curva = CurvaCrescimento.objects.filter(granja_id=granja_id).first()
+    if curva is not None:
+        return curva
+    with transaction.atomic():
+        _travar_granja(granja_id)
+        # outra requisição pode ter construído a curva enquanto esperávamos a trava
+        return CurvaCrescimento.objects.filter(granja_id=granja_id).first() or recalcular_curva(granja_id)
+
+
+def _parametros(curva):
+    """(a, b) de peso = a * idade^b, ou None se o histórico não basta."""
+    w, sx, sy, sxx, sxy = curva.soma_w, curva.soma_x, curva.soma_y, curva.soma_xx, curva.soma_xy
+    den = w * sxx - sx * sx
+    if w <= 0 or abs(den) < 1e-9:
+        return None
+    b = (w * sxy - sx * sy) / den
+    if b <= 0:
+        return None
+    return math.exp((sy - b * sx) / w), b
+
+
+# ----------------- projeção -----------------
+
+def projetar(lote, data_ref, peso_alvo):
+    """
+    Projeção do lote para a data `data_ref`: peso médio esperado, data prevista
+    para atingir `peso_alvo` e ração restante até lá. None se não houver histórico
+    ou dados de chegada suficientes.
+    """
+    curva = _curva(lote.granja_id)
+    params = _parametros(curva)
+    chegadas = eventos_do_lote(lote, 'chegadas')
+    data_chegada, idade_chegada, peso_chegada = _chegada_media(chegadas)
+    if params is None or idade_chegada is None:
+        return None
+    a, b = params
+
+    # ancora a curva no peso observado na chegada deste lote
+    fator = peso_chegada / (a * idade_chegada ** b) if peso_chegada else 1.0
+
+    def peso_em(d):
+        idade = idade_chegada + (d - data_chegada).days
+        return fator * a * max(idade, 1) ** b
+
+    idade_alvo = (peso_alvo / (fator * a)) ** (1 / b)
+    data_abate = data_chegada + timedelta(days=round(idade_alvo - idade_chegada))
+
+    peso_data = peso_em(data_ref)
+    cabecas = (
+        sum(c['quantidade'] for c in chegadas)
+        - len(eventos_do_lote(lote, 'mortes'))
+        - sum(s['quantidade'] for s in eventos_do_lote(lote, 'saidas'))
+    )
+    conversao = curva.racao_total / curva.ganho_total if curva.ganho_total > 0 else None
+    racao_restante = None
+    if conversao is not None:
+        racao_restante = round(conversao * max(cabecas, 0) * max(peso_alvo - peso_data, 0.0), 1)
+
+    return {
+        'lote_id': lote.id,
+        'data': data_ref.isoformat(),
+        'idade_dias': round(idade_chegada + (data_ref - data_chegada).days, 1),
+        'peso_medio_previsto': round(peso_data, 3),
+        'peso_alvo': peso_alvo,
+        'data_prevista_abate': data_abate.isoformat(),
+        'dias_para_abate': (data_abate - data_ref).days,
+        'suinos_no_lote': max(cabecas, 0),
+        'conversao_alimentar_historica': round(conversao, 4) if conversao is not None else None,
+        'racao_restante_prevista': racao_restante,
+        'curva': {'a': round(a, 6), 'b': round(b, 6), 'lotes': curva.lotes},
+    }
@@ -0,0 +1,56 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json da stdlib
+    orjson = None
+
+
+# Floats que o orjson escreve diferente do json da stdlib: expoente (1e16, 1.5e-7
+# contra 1e+16, 1.5e-07) e |x| < 1e-4 por extenso (0.00001 contra 1e-05). Com os
+# dígitos e delimitadores normalizados, basta procurar '0e' e ':0.0000'.
+_NORMALIZA_NUMEROS = bytes.maketrans(b'123456789,[-', b'000000000:::')
+
+
+def _float_divergente(ret):
+    ret = ret.translate(_NORMALIZA_NUMEROS)
+    return b'0e' in ret or b':0.0000' in ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer que usa orjson quando disponível.
+
+    A saída é a mesma do JSONRenderer do DRF (compacta, UTF-8, datas ISO e
+    datetimes com 'Z' em UTC). Datetimes e tipos que o orjson não conhece passam
+    pelo encoder do DRF; floats em notação científica ou menores que 1e-4 (ou
+    texto que se pareça com eles) fazem cair no render padrão. Exceção: NaN e
+    infinito saem como null, onde o DRF levantaria ValueError. Sem orjson, com
+    indentação pedida (ex.: browsable API) ou em caso de erro, cai no render
+    padrão.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = self.encoder_class()
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        if _float_divergente(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Mesmo escape do DRF para \u2028 e \u2029 (JSON como subconjunto de JS)
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -1,21 +1,187 @@
-from rest_framework import serializers
-from .models import Lote, Chegada, Morte, Observacao, RacaoEntrada, Saida
+from datetime import date, timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .models import Granja, HistoricoEvento, Lote, Chegada, Morte, Observacao, RacaoEntrada, Saida
+
+class GranjaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Granja
+        fields = ['id', 'nome', 'criado_em']
 
 class LoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lote
-        fields = ['id', 'nome', 'ativo', 'criado_em', 'finalizado_em']
+        fields = ['id', 'granja', 'nome', 'ativo', 'criado_em', 'finalizado_em', 'arquivado_em']
+        read_only_fields = ['granja', 'arquivado_em']
+
+class EventoLoteSerializer(serializers.ModelSerializer):
+    """
+    Base das escritas de eventos que mudam a contagem do lote (chegadas, mortes,
+    saídas). Trava a linha do lote, valida contra os contadores dele (suínos
+    vivos, primeira chegada) e os ajusta na mesma transação: cada escrita custa
+    O(1), sem recontar o histórico do lote.
+    """
+    # campo de data do evento (comparado com a primeira chegada)
+    campo_data = 'data'
+    # campo em que aparece o erro de suínos insuficientes
+    campo_vivos = 'quantidade'
+
+    def contagem(self, valores):
+        """
+        Deltas nos contadores do lote ({'total_chegadas': n, ...}) causados por um
+        evento com estes valores. Padrão: o evento não muda os contadores.
+        """
+        return {}
+
+    def validar_no_lote(self, lote, valores, instance):
+        """Checagens específicas do tipo de evento, com o lote já travado."""
+
+    def validar_exclusao(self, lote, instance):
+        """Checagens específicas da exclusão, com o lote já travado."""
+
+    # ----- escrita -----
+    def create(self, validated_data):
+        with transaction.atomic():
+            lote = self._travar_lote(validated_data['lote'].pk)
+            self.validar_no_lote(lote, validated_data, None)
+            deltas = self.contagem(validated_data)
+            self._checar_vivos(lote, deltas)
+            instance = super().create(validated_data)
+            self._aplicar(lote, deltas, instance)
+        return instance
+
+    def update(self, instance, validated_data):
+        if 'lote' in validated_data and validated_data['lote'].pk != instance.lote_id:
+            raise serializers.ValidationError({'lote': ['Não é permitido mover o evento para outro lote.']})
+        valores = {f: validated_data.get(f, getattr(instance, f)) for f in self.Meta.fields if f not in ('id', 'lote')}
+        with transaction.atomic():
+            lote = self._travar_lote(instance.lote_id)
+            self.validar_no_lote(lote, valores, instance)
+            antigo = self.contagem({f: getattr(instance, f) for f in valores})
+            novo = self.contagem(valores)
+            deltas = {k: novo.get(k, 0) - antigo.get(k, 0) for k in set(novo) | set(antigo)}
+            self._checar_vivos(lote, deltas)
+            instance = super().update(instance, validated_data)
+            self._aplicar(lote, deltas, instance)
+        return instance
+
+    def excluir(self, instance):
+        """Exclusão com o mesmo controle de contadores (usada pelo viewset)."""
+        with transaction.atomic():
+            lote = self._travar_lote(instance.lote_id)
+            self.validar_exclusao(lote, instance)
+            valores = {f: getattr(instance, f) for f in self.Meta.fields if f not in ('id', 'lote')}
+            deltas = {k: -v for k, v in self.contagem(valores).items()}
+            self._checar_vivos(lote, deltas)
+            instance.delete()
+            self._aplicar(lote, deltas, instance)
 
-class ChegadaSerializer(serializers.ModelSerializer):
+    # ----- contadores -----
+    def _travar_lote(self, lote_id):
+        lote = Lote.objects.select_for_update().get(pk=lote_id)
+        if lote.arquivado_em:
+            raise serializers.ValidationError({'lote': ['Lote arquivado não aceita alterações.']})
+        return lote
+
+    def _checar_vivos(self, lote, deltas):
+        vivos = lote.suinos_vivos()
+        depois = vivos + deltas.get('total_chegadas', 0) - deltas.get('total_mortes', 0) - deltas.get('total_saidas', 0)
+        # só barra o que reduz a contagem (dados antigos podem já estar negativos)
+        if depois < 0 and depois < vivos:
+            raise serializers.ValidationError(
+                {self.campo_vivos: [f'Registro deixaria o lote com suínos negativos (vivos: {vivos}).']}
+            )
+
+    def _aplicar(self, lote, deltas, instance):
+        campos = []
+        for campo, delta in deltas.items():
+            if delta:
+                setattr(lote, campo, getattr(lote, campo) + delta)
+                campos.append(campo)
+        if isinstance(instance, Chegada):
+            primeira = Chegada.objects.filter(lote=lote).aggregate(d=Min('data'))['d']
+            if primeira != lote.primeira_chegada:
+                lote.primeira_chegada = primeira
+                campos.append('primeira_chegada')
+        if campos:
+            # update() direto: a linha já está travada e não dispara sinais de Lote
+            Lote.objects.filter(pk=lote.pk).update(**{c: getattr(lote, c) for c in campos})
+
+    def _checar_data(self, lote, valores):
+        data = valores.get(self.campo_data)
+        if data and lote.primeira_chegada and data < lote.primeira_chegada:
+            raise serializers.ValidationError(
+                {self.campo_data: [f'Data anterior à primeira chegada do lote ({lote.primeira_chegada:%d/%m/%Y}).']}
+            )
+
+
+class ChegadaSerializer(EventoLoteSerializer):
     class Meta:
         model = Chegada
         fields = ['id', 'lote', 'data', 'quantidade', 'peso_medio', 'peso_total', 'origem', 'idade_media_dias', 'responsavel', 'observacoes', 'criado_em']
 
-class MorteSerializer(serializers.ModelSerializer):
+    def contagem(self, valores):
+        return {'total_chegadas': valores.get('quantidade') or 0}
+
+    def validar_no_lote(self, lote, valores, instance):
+        self._checar_primeira_chegada(lote, instance, valores.get('data'))
+
+    def validar_exclusao(self, lote, instance):
+        self._checar_primeira_chegada(lote, instance)
+
+    def _checar_primeira_chegada(self, lote, instance, data=None):
+        """
+        Na edição (nova `data`) ou exclusão de `instance`, a primeira chegada do
+        lote não pode passar da primeira morte ou saída. Só consulta quando
+        `instance` é a primeira chegada e deixaria de ser; MIN pelos índices
+        (lote, data).
+        """
+        atual = lote.primeira_chegada
+        if instance is None or atual is None or instance.data > atual:
+            return  # criação ou chegada que não era a primeira: não atrasa a primeira
+        if data is not None and data <= atual:
+            return
+        outras = Chegada.objects.filter(lote=lote).exclude(pk=instance.pk).aggregate(d=Min('data'))['d']
+        datas = [d for d in (outras, data) if d]
+        if not datas or min(datas) <= atual:
+            return
+        primeira = min(datas)
+        saidas = [d for d in (
+            Morte.objects.filter(lote=lote).aggregate(d=Min('data_morte'))['d'],
+            Saida.objects.filter(lote=lote).aggregate(d=Min('data'))['d'],
+        ) if d]
+        if saidas and primeira > min(saidas):
+            raise serializers.ValidationError(
+                {'data': [f'Primeira chegada do lote passaria para {primeira:%d/%m/%Y}, depois da '
+                          f'primeira morte/saída ({min(saidas):%d/%m/%Y}).']}
+            )
+
+class MorteSerializer(EventoLoteSerializer):
+    campo_data = 'data_morte'
+    campo_vivos = 'lote'
+
     class Meta:
         model = Morte
         fields = ['id', 'lote', 'data_morte', 'causa', 'mossa', 'sexo', 'criado_em']
 
+    def contagem(self, valores):
+        return {'total_mortes': 1}
+
+    def validar_no_lote(self, lote, valores, instance):
+        self._checar_data(lote, valores)
+        # índice (lote, mossa): consulta pontual
+        duplicada = Morte.objects.filter(lote=lote, mossa=valores.get('mossa'))
+        if instance is not None:
+            duplicada = duplicada.exclude(pk=instance.pk)
+        if duplicada.exists():
+            raise serializers.ValidationError({'mossa': ['Já existe morte registrada com esta mossa no lote.']})
+
 class ObservacaoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Observacao
@@ -26,11 +192,17 @@ class RacaoEntradaSerializer(serializers.ModelSerializer):
         model = RacaoEntrada
         fields = ['id', 'lote', 'tipo', 'origem', 'quantidade', 'data']
 
-class SaidaSerializer(serializers.ModelSerializer):
+class SaidaSerializer(EventoLoteSerializer):
     class Meta:
         model = Saida
         fields = ['id', 'lote', 'quantidade', 'peso_total', 'peso_medio', 'data', 'observacoes']
 
+    def contagem(self, valores):
+        return {'total_saidas': valores.get('quantidade') or 0}
+
+    def validar_no_lote(self, lote, valores, instance):
+        self._checar_data(lote, valores)
+
     def validate(self, attrs):
         q = attrs.get('quantidade')
         pt = attrs.get('peso_total')
@@ -40,6 +212,12 @@ class SaidaSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class HistoricoEventoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HistoricoEvento
+        fields = ['id', 'tabela', 'objeto_id', 'acao', 'diff', 'autor', 'criado_em']
+
+
 # Resumo do Lote
 class ResumoLoteSerializer(serializers.Serializer):
     lote_id = serializers.IntegerField()
@@ -49,3 +227,95 @@ class ResumoLoteSerializer(serializers.Serializer):
     suinos_em_andamento = serializers.IntegerField()
     peso_medio_ult_chegada = serializers.FloatField(allow_null=True)
     status = serializers.CharField()
+
+
+# ----------------- Listagem rápida (values_list) -----------------
+
+# Campos cujo to_representation pode ser reproduzido direto sobre o valor do banco
+_CONVERSORES_DIRETOS = {
+    serializers.IntegerField: None,
+    serializers.CharField: None,
+    serializers.ChoiceField: None,
+    serializers.BooleanField: None,
+    serializers.PrimaryKeyRelatedField: None,  # values_list('lote') já devolve o id
+    serializers.FloatField: float,
+    serializers.DateField: date.isoformat,
+}
+
+
+_DATETIME = 'datetime'  # conversor resolvido por chamada (depende do fuso atual)
+
+
+def _formato_iso(field, padrao):
+    return str(getattr(field, 'format', padrao)).lower() == ISO_8601
+
+
+def _datetime_iso_em(tz):
+    """
+    Mesmo resultado de DateTimeField.to_representation (formato ISO 8601) para o
+    fuso tz (None quando USE_TZ=False).
+    """
+    def conv(value):
+        if tz is not None:
+            value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, dt_timezone.utc)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return conv
+
+
+@lru_cache(maxsize=None)
+def values_layout(serializer_class):
+    """
+    Retorna (nomes, fontes, conversores) para montar a saída do serializer a partir
+    de values_list(), ou None se algum campo não tiver equivalente direto.
+    conversores é uma lista de (posição, função) aplicada apenas a valores não nulos.
+    """
+    nomes, fontes, conversores = [], [], []
+    for i, (nome, field) in enumerate(serializer_class().fields.items()):
+        if type(field) is serializers.DateTimeField:
+            if hasattr(field, 'timezone') or not _formato_iso(field, api_settings.DATETIME_FORMAT):
+                return None
+            conv = _DATETIME
+        elif type(field) is serializers.DateField and not _formato_iso(field, api_settings.DATE_FORMAT):
+            return None
+        elif type(field).__name__ == 'BigIntegerField':  # DRF >= 3.16 (ids BigAutoField)
+            conv = str if getattr(field, 'coerce_to_string', False) else None
+        elif type(field) in _CONVERSORES_DIRETOS:
+            conv = _CONVERSORES_DIRETOS[type(field)]
+        else:
+            return None
+        nomes.append(nome)
+        fontes.append(field.source)
+        if conv is not None:
+            conversores.append((i, conv))
+    return tuple(nomes), tuple(fontes), tuple(conversores)
+
+
+def serialize_values(queryset, serializer_class):
+    """
+    Equivalente somente leitura de serializer_class(queryset, many=True).data sem
+    instanciar modelos nem campos por linha. Retorna None se o serializer não for
+    suportado (o chamador deve usar o caminho normal).
+    """
+    layout = values_layout(serializer_class)
+    if layout is None:
+        return None
+    nomes, fontes, conversores = layout
+    if any(conv == _DATETIME for _, conv in conversores):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        conversores = [
+            (i, _datetime_iso_em(tz) if conv == _DATETIME else conv) for i, conv in conversores
+        ]
+    dados = []
+    for row in queryset.values_list(*fontes):
+        if conversores:
+            row = list(row)
+            for i, conv in conversores:
+                if row[i] is not None:
+                    row[i] = conv(row[i])
+        dados.append(dict(zip(nomes, row)))
+    return dados
@@ -0,0 +1,143 @@
+# porktekapp/stream.py
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions
+
+from .broadcast import broadcaster
+from .models import Lote
+from .renderers import FastJSONRenderer
+from .resumo import build_resumo_payload
+from .views import granja_da_requisicao
+
+
+def _resumo_ativo(granja_id):
+    lote = Lote.objects.ativo(granja_id)
+    return build_resumo_payload(lote) if lote else {'lote_id': None}
+
+
+def _mensagem(dados):
+    return b'event: resumo\ndata: ' + FastJSONRenderer().render(dados) + b'\n\n'
+
+
+class CanalResumo:
+    """
+    Resumo do lote ativo de uma granja compartilhado pelas conexões de stream dela:
+    uma única tarefa recalcula o resumo a cada mudança (ou batimento) e todas as
+    conexões recebem o mesmo resultado. O batimento periódico cobre mudanças
+    feitas por outros processos, que o broadcaster em processo não enxerga.
+    """
+
+    def __init__(self, granja_id):
+        self.granja_id = granja_id
+        self.resumo = None
+        self.versao = 0
+        self.erro = None
+        self.conexoes = 0
+        self._novo = asyncio.Condition()
+        self._tarefa = asyncio.get_running_loop().create_task(self._produzir())
+
+    async def _produzir(self):
+        intervalo = getattr(settings, 'RESUMO_STREAM_HEARTBEAT', 15)
+        evento = broadcaster.assinar(self.granja_id)
+        try:
+            while True:
+                try:
+                    resumo = await sync_to_async(_resumo_ativo)(self.granja_id)
+                except Exception as exc:
+                    # encerra as conexões; a próxima reconexão cria outro canal
+                    self.erro = exc
+                    _canais.pop((asyncio.get_running_loop(), self.granja_id), None)
+                    resumo = None
+                async with self._novo:
+                    self.resumo = resumo
+                    self.versao += 1
+                    self._novo.notify_all()
+                if self.erro is not None:
+                    return
+
+                try:
+                    await asyncio.wait_for(evento.wait(), timeout=intervalo)
+                    # agrupa rajadas de gravações num único recálculo
+                    await asyncio.sleep(0.25)
+                except asyncio.TimeoutError:
+                    pass
+                evento.clear()
+        finally:
+            broadcaster.cancelar(evento)
+
+    async def proximo(self, versao):
+        """Espera um resumo mais novo que `versao`; devolve (resumo, versão)."""
+        async with self._novo:
+            await self._novo.wait_for(lambda: self.versao > versao)
+            if self.erro is not None:
+                raise self.erro
+            return self.resumo, self.versao
+
+    def encerrar(self):
+        self._tarefa.cancel()
+
+
+# (loop, granja_id) -> CanalResumo com conexões abertas
+_canais = {}
+
+
+def _entrar(granja_id):
+    chave = (asyncio.get_running_loop(), granja_id)
+    canal = _canais.get(chave)
+    if canal is None:
+        canal = _canais[chave] = CanalResumo(granja_id)
+    canal.conexoes += 1
+    return canal
+
+
+def _sair(canal):
+    canal.conexoes -= 1
+    if canal.conexoes == 0:
+        chave = (asyncio.get_running_loop(), canal.granja_id)
+        if _canais.get(chave) is canal:
+            del _canais[chave]
+        canal.encerrar()
+
+
+async def _eventos(granja_id):
+    """
+    Primeiro envia o resumo completo do lote ativo; depois, a cada resumo novo do
+    canal da granja, só as chaves alteradas (ou o resumo completo se o lote ativo
+    mudou).
+    """
+    canal = _entrar(granja_id)
+    try:
+        anterior, versao = None, 0
+        while True:
+            atual, versao = await canal.proximo(versao)
+            if anterior is None or anterior.get('lote_id') != atual.get('lote_id'):
+                yield _mensagem(atual)
+            else:
+                delta = {k: v for k, v in atual.items() if anterior.get(k) != v}
+                yield _mensagem(delta) if delta else b': ping\n\n'
+            anterior = atual
+    finally:
+        _sair(canal)
+
+
+# ---------- /api/lotes/ativo/stream/ ----------
+async def resumo_ativo_stream(request):
+    """
+    Server-sent events com o resumo do lote ativo da granja. Requer o app ASGI
+    (porktek.asgi); no WSGI a conexão prenderia um worker indefinidamente.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Stream disponível apenas via ASGI.'}, status=501)
+    try:
+        granja = await sync_to_async(granja_da_requisicao)(request)
+    except exceptions.APIException as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+
+    resp = StreamingHttpResponse(_eventos(granja.pk), content_type='text/event-stream')
+    resp['Cache-Control'] = 'no-cache'
+    resp['X-Accel-Buffering'] = 'no'  # nginx: não bufferizar o stream
+    return resp
@@ -1,3 +1,420 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from . import db_router, stream
+from .arquivo import arquivar_lote
+from .auditoria import registrar
+from .projecao import SOMAS, recalcular_curva
+from .broadcast import broadcaster
+from .models import (
+    Chegada, CurvaCrescimento, Granja, HistoricoEvento, Lote, LoteManager, Morte, Observacao, RacaoEntrada, Saida,
+    invalidar_granjas, invalidar_lote_ativo,
+)
+from .renderers import FastJSONRenderer, orjson
+from .serializers import (
+    ChegadaSerializer, MorteSerializer, ObservacaoSerializer, RacaoEntradaSerializer, SaidaSerializer,
+    serialize_values, values_layout,
+)
+from .views import ObservacaoViewSet
+
+
+def _replica_atrasada():
+    """
+    Simula uma réplica que ainda não recebeu os lotes gravados: dentro de
+    leitura_replica(), as consultas de Lote saem do alias 'replica' e vêm vazias.
+    """
+    get_queryset = LoteManager.get_queryset
+
+    def queryset(manager):
+        qs = get_queryset(manager)
+        return qs.none() if db_router._usar_replica.get() else qs
+
+    def alias(manager):
+        return 'replica' if db_router._usar_replica.get() else 'default'
+
+    return mock.patch.multiple(
+        LoteManager, get_queryset=queryset, db=property(alias)
+    )
+
+
+class PorktekTestCase(TestCase):
+    """Caches em processo (granjas, lote ativo) não voltam com o rollback do teste."""
+
+    def setUp(self):
+        invalidar_granjas()
+        invalidar_lote_ativo()
+
+
+class LoteAtivoReplicaTests(PorktekTestCase):
+    def setUp(self):
+        super().setUp()
+        Granja.objects.get_or_create(nome='Granja principal')
+
+    def test_leitura_atrasada_da_replica_nao_alimenta_cache(self):
+        cliente_a = self.client
+        cliente_b = self.client_class()
+        with _replica_atrasada():
+            resp = cliente_a.post('/api/lotes/criar_ativo/', {'nome': 'Lote 1'}, content_type='application/json')
+            self.assertEqual(resp.status_code, 201)
+            self.assertIn(db_router.COOKIE_PRIMARIO, cliente_a.cookies)
+
+            # cliente sem escrita recente lê da réplica, que ainda não tem o lote
+            self.assertEqual(cliente_b.get('/api/lotes/ativo/resumo/').status_code, 404)
+
+            # quem gravou continua no banco principal e vê o lote criado
+            self.assertEqual(cliente_a.get('/api/lotes/ativo/').status_code, 200)
+            self.assertEqual(cliente_a.get('/api/lotes/ativo/resumo/').status_code, 200)
+
+
+class StreamResumoTests(SimpleTestCase):
+    async def test_resumo_calculado_uma_vez_por_mudanca_para_todas_as_conexoes(self):
+        chamadas = []
+
+        def resumo_ativo(granja_id):
+            chamadas.append(granja_id)
+            return {'lote_id': 1, 'suinos_em_andamento': 10 * len(chamadas)}
+
+        with mock.patch.object(stream, '_resumo_ativo', resumo_ativo):
+            conexoes = [stream._eventos(7) for _ in range(5)]
+            primeiras = [await c.__anext__() for c in conexoes]
+            self.assertEqual(len(chamadas), 1)
+            self.assertTrue(all(b'"lote_id":1' in m for m in primeiras))
+
+            broadcaster.publicar(7)
+            deltas = [await c.__anext__() for c in conexoes]
+            self.assertEqual(len(chamadas), 2)
+            self.assertTrue(all(m.endswith(b'data: {"suinos_em_andamento":20}\n\n') for m in deltas))
+
+            for c in conexoes:
+                await c.aclose()
+        self.assertEqual(stream._canais, {})
+
+
+class LoteArquivadoTests(PorktekTestCase):
+    def setUp(self):
+        super().setUp()
+        granja = Granja.objects.get_or_create(nome='Granja principal')[0]
+        self.lote = Lote.objects.create(granja=granja, nome='Lote 1', ativo=False)
+        arquivar_lote(self.lote)
+
+    def test_racao_rejeitada_em_lote_arquivado(self):
+        racao = {'lote': self.lote.pk, 'tipo': 'FASE1', 'origem': 'Fábrica', 'quantidade': 500, 'data': '2024-01-10'}
+        resp = self.client.post('/api/racoes/', racao, content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('lote', resp.json())
+        self.assertFalse(RacaoEntrada.objects.exists())
+
+    def test_observacao_aceita_em_lote_arquivado(self):
+        # observações não são arquivadas: a listagem continua vindo da tabela quente
+        resp = self.client.post('/api/observacoes/', {'lote': self.lote.pk, 'texto': 'x'}, content_type='application/json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(len(self.client.get(f'/api/observacoes/?lote={self.lote.pk}').json()), 1)
+
+
+class ProjecaoTests(PorktekTestCase):
+    def setUp(self):
+        super().setUp()
+        granja = self.granja = Granja.objects.get_or_create(nome='Granja principal')[0]
+        anterior = self.anterior = Lote.objects.create(granja=granja, nome='Lote 1', ativo=False)
+        Chegada.objects.create(lote=anterior, data=date(2024, 1, 1), quantidade=100, peso_medio=22.0,
+                               origem='Origem', idade_media_dias=60, responsavel='João')
+        Saida.objects.create(lote=anterior, data=date(2024, 4, 10), quantidade=90, peso_total=10350.0, peso_medio=115.0)
+        anterior.recontar()
+        self.lote = Lote.objects.create(granja=granja, nome='Lote 2', ativo=True)
+        Chegada.objects.create(lote=self.lote, data=date(2024, 6, 1), quantidade=100, peso_medio=23.0,
+                               origem='Origem', idade_media_dias=62, responsavel='João')
+
+    def test_peso_alvo(self):
+        url = f'/api/lotes/{self.lote.pk}/projecao/?data=2024-07-01&peso_alvo='
+        self.assertEqual(self.client.get(url + '120').status_code, 200)
+        for valor in ('inf', 'nan', '-1', '1e308'):
+            with self.subTest(peso_alvo=valor):
+                self.assertEqual(self.client.get(url + valor).status_code, 400)
+
+    def _assert_curva_em_dia(self):
+        curva = CurvaCrescimento.objects.get(granja=self.granja)
+        somas = {k: getattr(curva, k) for k in SOMAS}
+        refeita = recalcular_curva(self.granja.pk)
+        self.assertEqual((curva.lotes, somas), (refeita.lotes, {k: getattr(refeita, k) for k in SOMAS}))
+
+    def test_evento_de_lote_finalizado_refaz_curva(self):
+        url = f'/api/lotes/{self.lote.pk}/projecao/?data=2024-07-01'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        resp = self.client.post('/api/saidas/', {
+            'lote': self.anterior.pk, 'data': '2024-04-20', 'quantidade': 5, 'peso_total': 600.0, 'peso_medio': 120.0,
+        }, content_type='application/json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self._assert_curva_em_dia()
+
+    def test_finalizar_soma_o_lote_uma_vez(self):
+        # curva construída sob demanda antes da finalização
+        self.assertEqual(self.client.get(f'/api/lotes/{self.lote.pk}/projecao/?data=2024-07-01').status_code, 200)
+        Saida.objects.create(lote=self.lote, data=date(2024, 9, 1), quantidade=100, peso_total=12000.0, peso_medio=120.0)
+        self.assertEqual(self.client.post('/api/lotes/finalizar_ativo/').status_code, 200)
+        self.assertEqual(CurvaCrescimento.objects.get(granja=self.granja).lotes, 2)
+        self._assert_curva_em_dia()
+
+
+class HistoricoTests(PorktekTestCase):
+    def setUp(self):
+        super().setUp()
+        granja = Granja.objects.get_or_create(nome='Granja principal')[0]
+        self.lote = Lote.objects.create(granja=granja, nome='Lote 1', ativo=True)
+        for i in range(5):
+            registrar('racoes', self.lote.pk, i + 1, 'C', depois={'id': i + 1, 'quantidade': 100})
+
+    def test_log_paginado(self):
+        url = f'/api/lotes/{self.lote.pk}/historico/?limite=2'
+        ids = []
+        while url:
+            pagina = self.client.get(url).json()
+            self.assertLessEqual(len(pagina['results']), 2)
+            ids += [r['objeto_id'] for r in pagina['results']]
+            url = pagina['next']
+        self.assertEqual(ids, [5, 4, 3, 2, 1])
+        self.assertEqual(HistoricoEvento.objects.count(), 5)
+
+    @override_settings(TIME_ZONE='America/Sao_Paulo')
+    def test_criado_em_no_fuso_local(self):
+        registro = self.client.get(f'/api/lotes/{self.lote.pk}/historico/').json()['results'][0]
+        self.assertTrue(registro['criado_em'].endswith('-03:00'))
+
+    def test_data_impossivel(self):
+        resp = self.client.get(f'/api/lotes/{self.lote.pk}/historico/?em=2024-13-45T10:00')
+        self.assertEqual(resp.status_code, 400)
+
+
+@skipIf(orjson is None, 'orjson não instalado')
+class FastJSONRendererTests(SimpleTestCase):
+    def test_mesma_saida_do_json_renderer(self):
+        for valor in (0.1, 22.700000000000003, 120.125, 1e-4, 1e-05, -9.99e-05, 1.5e-07, 1e15, 1e16, 1.234e+16,
+                      'Fase1e', 'e-mail 0.00001', None, [1, 2.5]):
+            with self.subTest(valor=valor):
+                data = [{'id': 1, 'valor': valor, 'texto': 'Observação \u2028'}]
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_nao_finito_vira_null(self):
+        self.assertEqual(FastJSONRenderer().render({'peso': float('nan')}), b'{"peso":null}')
+
+
+class ContadoresLoteTests(PorktekTestCase):
+    def setUp(self):
+        super().setUp()
+        granja = Granja.objects.get_or_create(nome='Granja principal')[0]
+        self.lote = Lote.objects.create(granja=granja, nome='Lote 1', ativo=True)
+
+    def _post(self, url, dados):
+        return self.client.post(url, {'lote': self.lote.pk, **dados}, content_type='application/json')
+
+    def _chegada(self, quantidade, data='2024-01-10'):
+        return self._post('/api/chegadas/', {
+            'data': data, 'quantidade': quantidade, 'peso_medio': 22.0, 'origem': 'Origem', 'responsavel': 'João',
+        })
+
+    def _morte(self, mossa, data='2024-02-01'):
+        return self._post('/api/mortes/', {'data_morte': data, 'causa': 'Diarreia', 'mossa': mossa})
+
+    def _saida(self, quantidade, data='2024-04-01'):
+        return self._post('/api/saidas/', {'data': data, 'quantidade': quantidade, 'peso_total': 100.0 * quantidade, 'peso_medio': 100.0})
+
+    def _contadores(self):
+        self.lote.refresh_from_db()
+        return (self.lote.total_chegadas, self.lote.total_mortes, self.lote.total_saidas, self.lote.primeira_chegada)
+
+    def test_suinos_negativos(self):
+        self.assertEqual(self._chegada(10).status_code, 201)
+        self.assertEqual(self._saida(11).status_code, 400)
+        self.assertEqual(self._saida(9).status_code, 201)
+        self.assertEqual(self._morte('1').status_code, 201)
+        self.assertEqual(self._morte('2').status_code, 400)
+        self.assertEqual(self._contadores(), (10, 1, 9, date(2024, 1, 10)))
+
+    def test_datas_anteriores_a_primeira_chegada(self):
+        self.assertEqual(self._chegada(10, data='2024-01-10').status_code, 201)
+        self.assertEqual(self._morte('1', data='2024-01-09').status_code, 400)
+        self.assertEqual(self._saida(1, data='2024-01-09').status_code, 400)
+        self.assertEqual(self._chegada(5, data='2024-01-05').status_code, 201)
+        self.assertEqual(self._morte('1', data='2024-01-09').status_code, 201)
+        self.assertEqual(self._contadores(), (15, 1, 0, date(2024, 1, 5)))
+
+    def test_chegada_nao_passa_da_primeira_morte_ou_saida(self):
+        chegada = self._chegada(10, data='2024-01-01').json()
+        self._morte('1', data='2024-01-02')
+        url = f'/api/chegadas/{chegada["id"]}/'
+        resp = self.client.patch(url, {'data': '2024-03-01'}, content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.client.patch(url, {'data': '2024-01-02'}, content_type='application/json').status_code, 200)
+        self.assertEqual(self._contadores(), (10, 1, 0, date(2024, 1, 2)))
+
+    def test_exclusao_da_primeira_chegada_nao_passa_da_primeira_saida(self):
+        primeira = self._chegada(10, data='2024-01-01').json()
+        self._chegada(10, data='2024-03-01')
+        self._saida(5, data='2024-02-01')
+        self.assertEqual(self.client.delete(f'/api/chegadas/{primeira["id"]}/').status_code, 400)
+        self.assertEqual(self._contadores(), (20, 0, 5, date(2024, 1, 1)))
+
+    def test_mossa_duplicada(self):
+        self._chegada(10)
+        morte = self._morte('42').json()
+        self.assertEqual(self._morte('42').status_code, 400)
+        resp = self.client.patch(f'/api/mortes/{morte["id"]}/', {'causa': 'Outra'}, content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_exclusoes(self):
+        primeira = self._chegada(10, data='2024-01-05').json()
+        self._chegada(5, data='2024-01-10')
+        saida = self._saida(12).json()
+        # excluir a chegada de 10 deixaria 5 - 12 suínos
+        self.assertEqual(self.client.delete(f'/api/chegadas/{primeira["id"]}/').status_code, 400)
+        self.assertEqual(self.client.delete(f'/api/saidas/{saida["id"]}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/chegadas/{primeira["id"]}/').status_code, 204)
+        self.assertEqual(self._contadores(), (5, 0, 0, date(2024, 1, 10)))
+
+    def test_admin_mantem_contadores(self):
+        self._chegada(10)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+        resp = self.client.post('/admin/porktekapp/morte/add/', {
+            'lote': self.lote.pk, 'data_morte': '2024-02-01', 'causa': 'Diarreia', 'mossa': '7', 'sexo': 'ND',
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(self._contadores(), (10, 1, 0, date(2024, 1, 10)))
+
+        chegada = Chegada.objects.get()
+        resp = self.client.post(f'/admin/porktekapp/chegada/{chegada.pk}/change/', {
+            'lote': self.lote.pk, 'data': '2024-01-03', 'quantidade': 4, 'peso_medio': 22.0,
+            'origem': 'Origem', 'responsavel': 'João', 'observacoes': '',
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(self._contadores(), (4, 1, 0, date(2024, 1, 3)))
+
+        morte = Morte.objects.get()
+        self.assertEqual(self.client.post(f'/admin/porktekapp/morte/{morte.pk}/delete/', {'post': 'yes'}).status_code, 302)
+        self.assertEqual(self._contadores(), (4, 0, 0, date(2024, 1, 3)))
+
+
+class GranjaDaRequisicaoTests(PorktekTestCase):
+    def setUp(self):
+        super().setUp()
+        self.principal = Granja.objects.get_or_create(nome='Granja principal')[0]
+        Lote.objects.create(granja=self.principal, nome='Lote 1', ativo=True)
+
+    def test_granja_unica_dispensa_header(self):
+        self.assertEqual(self.client.get('/api/lotes/').status_code, 200)
+
+    def test_varias_granjas_exigem_header(self):
+        outra = Granja.objects.create(nome='Outra granja')
+        self.assertEqual(self.client.get('/api/lotes/').status_code, 400)
+        self.assertEqual(self.client.get('/api/lotes/ativo/').status_code, 400)
+        self.assertEqual(len(self.client.get('/api/lotes/', headers={'X-Granja': str(self.principal.pk)}).json()), 1)
+        self.assertEqual(self.client.get(f'/api/lotes/?granja={outra.pk}').json(), [])
+        self.assertEqual(self.client.get('/api/lotes/', headers={'X-Granja': '999'}).status_code, 404)
+
+    def test_lote_ativo_sem_consultas_com_cache_quente(self):
+        self.assertEqual(self.client.get('/api/lotes/ativo/').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/lotes/ativo/').status_code, 200)
+            resp = self.client.get('/api/lotes/ativo/', headers={'X-Granja': str(self.principal.pk)})
+            self.assertEqual(resp.status_code, 200)
+
+    def test_granja_criada_invalida_cache(self):
+        self.assertEqual(self.client.get('/api/lotes/ativo/').status_code, 200)
+        Granja.objects.create(nome='Outra granja')
+        self.assertEqual(self.client.get('/api/lotes/ativo/').status_code, 400)
+
+
+class SerializeValuesTests(PorktekTestCase):
+    def setUp(self):
+        super().setUp()
+        granja = Granja.objects.get_or_create(nome='Granja principal')[0]
+        lote = Lote.objects.create(granja=granja, nome='Lote 1', ativo=True)
+        Chegada.objects.create(lote=lote, data=date(2024, 1, 1), quantidade=10, peso_medio=22.5, peso_total=None,
+                               origem='Origem', idade_media_dias=None, responsavel='João')
+        Chegada.objects.create(lote=lote, data=date(2024, 1, 2), quantidade=5, peso_medio=0.1 + 0.2, peso_total=112.5,
+                               origem='Origem', idade_media_dias=60, responsavel='João', observacoes='Obs')
+        Morte.objects.create(lote=lote, data_morte=date(2024, 1, 3), causa='Diarreia', mossa='7')
+        Observacao.objects.create(lote=lote, texto='Texto com \u2028 e acentuação')
+        RacaoEntrada.objects.create(lote=lote, tipo='FASE1', origem='Fábrica', quantidade=500, data=date(2024, 1, 4))
+        Saida.objects.create(lote=lote, quantidade=5, peso_total=600.0, peso_medio=120.0, data=date(2024, 3, 1))
+
+    def test_mesma_saida_do_serializer(self):
+        for fuso in ('UTC', 'America/Sao_Paulo'):
+            for serializer_class in (ChegadaSerializer, MorteSerializer, ObservacaoSerializer,
+                                     RacaoEntradaSerializer, SaidaSerializer):
+                with self.subTest(fuso=fuso, serializer=serializer_class.__name__), override_settings(TIME_ZONE=fuso):
+                    qs = serializer_class.Meta.model.objects.order_by('id')
+                    # bytes renderizados: mesmas chaves, valores e ordem
+                    self.assertEqual(
+                        JSONRenderer().render(serialize_values(qs, serializer_class)),
+                        JSONRenderer().render(serializer_class(qs, many=True).data),
+                    )
+
+    def test_datetime_no_fuso_local(self):
+        with override_settings(TIME_ZONE='America/Sao_Paulo'):
+            dados = serialize_values(Observacao.objects.all(), ObservacaoSerializer)
+        self.assertTrue(dados[0]['criado_em'].endswith('-03:00'))
+
+    def test_serializer_nao_suportado(self):
+        class ComMetodo(ObservacaoSerializer):
+            tamanho = serializers.SerializerMethodField()
+
+            class Meta(ObservacaoSerializer.Meta):
+                fields = ObservacaoSerializer.Meta.fields + ['tamanho']
+
+            def get_tamanho(self, obj):
+                return len(obj.texto)
+
+        self.assertIsNone(values_layout(ComMetodo))
+        self.assertIsNone(serialize_values(Observacao.objects.all(), ComMetodo))
+        # a listagem cai no serializer normal
+        with mock.patch.object(ObservacaoViewSet, 'serializer_class', ComMetodo):
+            dados = self.client.get('/api/observacoes/').json()
+        self.assertEqual(dados[0]['tamanho'], len(Observacao.objects.get().texto))
+
+
+class LoteAtivoTests(PorktekTestCase):
+    def setUp(self):
+        super().setUp()
+        self.granja = Granja.objects.get_or_create(nome='Granja principal')[0]
+
+    def _criar_ativo(self, nome):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/lotes/criar_ativo/', {'nome': nome}, content_type='application/json')
+
+    def test_segundo_criar_ativo(self):
+        self.assertEqual(self._criar_ativo('Lote 1').status_code, 201)
+        self.assertEqual(self._criar_ativo('Lote 2').status_code, 400)
+        self.assertEqual(Lote.objects.filter(ativo=True).count(), 1)
+
+    def test_constraint_vira_400(self):
+        Lote.objects.create(granja=self.granja, nome='Lote 1', ativo=True)
+        # sem a checagem prévia, sobra a constraint unico_lote_ativo_por_granja
+        sem_ativo = mock.MagicMock()
+        sem_ativo.filter.return_value.first.return_value = None
+        with mock.patch.object(LoteManager, 'select_for_update', return_value=sem_ativo):
+            self.assertEqual(self._criar_ativo('Lote 2').status_code, 400)
+
+        finalizado = Lote.objects.create(granja=self.granja, nome='Lote 0', ativo=False)
+        resp = self.client.patch(f'/api/lotes/{finalizado.pk}/', {'ativo': True}, content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Lote.objects.filter(ativo=True).count(), 1)
+
+    def test_cache_do_lote_ativo(self):
+        lote = Lote.objects.create(granja=self.granja, nome='Lote 1', ativo=True)
+        self.assertEqual(Lote.objects.ativo(self.granja), lote)
+        with self.assertNumQueries(0):
+            self.assertEqual(Lote.objects.ativo(self.granja), lote)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/lotes/finalizar_ativo/').status_code, 200)
+        self.assertIsNone(Lote.objects.ativo(self.granja))
+        with self.assertNumQueries(0):
+            self.assertIsNone(Lote.objects.ativo(self.granja))
+
+        novo = self._criar_ativo('Lote 2').json()
+        self.assertEqual(Lote.objects.ativo(self.granja).pk, novo['id'])
@@ -1,228 +1,316 @@
 # porktekapp/views.py
-from datetime import date, datetime
-from decimal import Decimal
+import math
 
-from django.db.models import Sum
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from rest_framework import viewsets, decorators, response, status
-
-from .models import Lote, Chegada, Morte, Observacao, RacaoEntrada, Saida
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import viewsets, decorators, exceptions, pagination, response, status
+
+from .models import Granja, HistoricoEvento, Lote, Chegada, Morte, Observacao, RacaoEntrada, Saida
+from .arquivo import eventos_arquivados
+from .auditoria import historico_em, registrar, registros_em_lote
+from .broadcast import publicar_granja
+from .db_router import leitura_fixada_no_primario, leitura_replica
+from .projecao import TABELAS_DA_CURVA, descartar_curva, incorporar_lote, projetar
+from .resumo import build_resumo_payload
 from .serializers import (
-    LoteSerializer, ChegadaSerializer, MorteSerializer,
-    ObservacaoSerializer, RacaoEntradaSerializer, SaidaSerializer
+    GranjaSerializer, HistoricoEventoSerializer, LoteSerializer, ChegadaSerializer, MorteSerializer,
+    ObservacaoSerializer, RacaoEntradaSerializer, SaidaSerializer,
+    serialize_values,
 )
 
 # ----------------- helpers -----------------
 
-def _date_to_ordinal(d):
+class ReplicaMixin:
     """
-    Aceita date, datetime ou string 'YYYY-MM-DD'; retorna ordinal (int) ou None.
+    Ações em `replica_actions` leem da réplica (ReplicaRouter), exceto para o
+    cliente que acabou de gravar (ver ReplicaStickyMiddleware).
     """
-    if not d:
-        return None
-    if isinstance(d, datetime):
-        d = d.date()
-    if isinstance(d, str):
-        try:
-            y, m, day = [int(x) for x in d.split('-')]
-            d = date(y, m, day)
-        except Exception:
-            return None
-    if isinstance(d, date):
-        return d.toordinal()
-    return None
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        acao = self.action_map.get(request.method.lower())
+        if acao in self.replica_actions and not leitura_fixada_no_primario(request):
+            with leitura_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
 
 
-def _to_date(v):
+class FastListMixin:
     """
-    Converte v para date. Aceita datetime, date ou ISO 'YYYY-MM-DD'.
+    `list` somente leitura via values_list(): mesma saída do serializer, sem
+    instanciar modelos e campos por linha. Com paginação ou serializer não
+    suportado, usa o `list` padrão.
     """
-    if v is None:
-        return None
-    if isinstance(v, date) and not isinstance(v, datetime):
-        return v
-    if isinstance(v, datetime):
-        return v.date()
-    if isinstance(v, str):
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = serialize_values(queryset, self.get_serializer_class())
+            if data is not None:
+                return response.Response(data)
+        return super().list(request, *args, **kwargs)
+
+
+class ArquivoListMixin:
+    """
+    `list` com ?lote=ID de um lote arquivado lê os eventos do arquivo, no mesmo
+    formato das tabelas quentes.
+    """
+    # chave da tabela em LoteArquivo.eventos
+    arquivo_chave = None
+
+    def list(self, request, *args, **kwargs):
+        lote_id = request.query_params.get('lote')
+        if lote_id and lote_id.isdigit() and Lote.objects.filter(
+            pk=lote_id, granja=self.get_granja(), arquivado_em__isnull=False
+        ).exists():
+            data = eventos_arquivados(int(lote_id), self.arquivo_chave)
+            if data is not None:
+                return response.Response(data)
+        return super().list(request, *args, **kwargs)
+
+
+def granja_da_requisicao(request):
+    """
+    Granja do header X-Granja ou de ?granja=ID. Sem nenhum dos dois, só vale a
+    granja única (instalações de uma granja só); com mais de uma cadastrada a
+    requisição é recusada, para não ler ou gravar na granja errada. Resolve pelo
+    cache de Granja.objects.cadastradas(), sem consulta por requisição.
+    Levanta NotFound ou ParseError.
+    """
+    granjas = Granja.objects.cadastradas()
+    granja_id = request.headers.get('X-Granja') or request.GET.get('granja')
+    if granja_id:
         try:
-            y, m, d = [int(x) for x in v.split('-')]
-            return date(y, m, d)
-        except Exception:
-            return None
-    return None
+            granja_id = int(granja_id)
+        except ValueError:
+            raise exceptions.NotFound('Granja não encontrada.')
+        # fora do cache: pode ter sido criada há pouco em outro processo
+        granja = granjas.get(granja_id) or Granja.objects.filter(pk=granja_id).first()
+        if granja is None:
+            raise exceptions.NotFound('Granja não encontrada.')
+        return granja
+    if not granjas:
+        raise exceptions.NotFound('Nenhuma granja cadastrada.')
+    if len(granjas) > 1:
+        raise exceptions.ParseError('Informe a granja (header X-Granja ou ?granja=ID).')
+    return next(iter(granjas.values()))
+
+
+class GranjaMixin:
+    """
+    Escopo por granja: querysets filtrados pela granja da requisição
+    (ver granja_da_requisicao).
+    """
+    # caminho do filtro de granja a partir do modelo do viewset
+    granja_lookup = 'lote__granja'
+
+    def get_granja(self):
+        if not hasattr(self, '_granja'):
+            self._granja = granja_da_requisicao(self.request)
+        return self._granja
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{self.granja_lookup: self.get_granja()})
+
+    # lote informado no corpo precisa ser da granja da requisição (e não arquivado,
+    # nas tabelas que vão para o arquivo); gravações avisam os streams de resumo
+    # da granja (ver stream.py)
+    def perform_create(self, serializer):
+        self._checar_granja_do_lote(serializer)
+        super().perform_create(serializer)
+        self._evento_alterado(serializer.instance.lote)
+
+    def perform_update(self, serializer):
+        self._checar_granja_do_lote(serializer)
+        super().perform_update(serializer)
+        self._evento_alterado(serializer.instance.lote)
+
+    def perform_destroy(self, instance):
+        lote = instance.lote
+        super().perform_destroy(instance)
+        self._evento_alterado(lote)
+
+    def _evento_alterado(self, lote):
+        publicar_granja(self.get_granja().pk)
+        # eventos de lote finalizado entram na curva de crescimento (ver projecao.py)
+        if not lote.ativo and getattr(self, 'arquivo_chave', None) in TABELAS_DA_CURVA:
+            descartar_curva(lote.granja_id)
+
+    def _checar_granja_do_lote(self, serializer):
+        lote = serializer.validated_data.get('lote')
+        if lote is None:
+            return
+        if lote.granja_id != self.get_granja().pk:
+            raise exceptions.ValidationError({'lote': ['Lote não pertence a esta granja.']})
+        # os eventos do lote arquivado são lidos do arquivo (ver ArquivoListMixin);
+        # observações ficam nas tabelas quentes e continuam aceitas
+        if lote.arquivado_em and getattr(self, 'arquivo_chave', None):
+            raise exceptions.ValidationError({'lote': ['Lote arquivado não aceita alterações.']})
+
+
+class EventoLoteMixin:
+    """
+    Exclusões de chegadas, mortes e saídas passam pelo serializer para manter os
+    contadores do lote (ver EventoLoteSerializer).
+    """
 
+    def perform_destroy(self, instance):
+        self.get_serializer().excluir(instance)
 
-def _f(x, digits=None):
+
+class AuditoriaMixin:
     """
-    Converte Decimal/None/str para float ou None. Se digits for int, arredonda.
+    Registra criações, edições e exclusões no HistoricoEvento, na mesma
+    transação da escrita (gravação em lote ao final da requisição).
+    O autor vem do usuário autenticado ou do header X-Responsavel.
     """
-    if x is None:
-        return None
-    if isinstance(x, Decimal):
-        x = float(x)
-    try:
-        xf = float(x)
-        if isinstance(digits, int):
-            return round(xf, digits)
-        return xf
-    except Exception:
-        return None
-
-
-def _safe_div(num, den, digits=None):
+    # chave da tabela no histórico (mesma de LoteArquivo.eventos)
+    arquivo_chave = None
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic(), registros_em_lote():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic(), registros_em_lote():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic(), registros_em_lote():
+            return super().destroy(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        obj = serializer.instance
+        self._registrar(obj.lote_id, obj.pk, 'C', depois=serializer.data)
+
+    def perform_update(self, serializer):
+        antes = self.get_serializer(serializer.instance).data
+        super().perform_update(serializer)
+        obj = serializer.instance
+        self._registrar(obj.lote_id, obj.pk, 'U', antes=antes, depois=serializer.data)
+
+    def perform_destroy(self, instance):
+        antes = self.get_serializer(instance).data
+        lote_id, pk = instance.lote_id, instance.pk
+        super().perform_destroy(instance)
+        self._registrar(lote_id, pk, 'D', antes=antes)
+
+    def _registrar(self, lote_id, objeto_id, acao, antes=None, depois=None):
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            autor = str(user)
+        else:
+            autor = self.request.headers.get('X-Responsavel', '')
+        registrar(self.arquivo_chave, lote_id, objeto_id, acao, antes=antes, depois=depois, autor=autor)
+
+
+class HistoricoPaginacao(pagination.CursorPagination):
     """
-    Divide com guarda (retorna None se inválido).
+    Log de um lote do mais recente para o mais antigo, em páginas por cursor
+    (índice lote_id, criado_em): cada página custa o mesmo, por maior que seja o log.
     """
-    n = _f(num)
-    d = _f(den)
-    if n is None or d is None or d == 0:
-        return None
-    val = n / d
-    return round(val, digits) if isinstance(digits, int) else val
+    ordering = ('-criado_em', '-id')
+    page_size = 200
+    page_size_query_param = 'limite'
+    max_page_size = 1000
+
+
+# ----------------- Granjas -----------------
+
+class GranjaViewSet(viewsets.ModelViewSet):
+    queryset = Granja.objects.all().order_by('nome')
+    serializer_class = GranjaSerializer
+
+    def destroy(self, request, *args, **kwargs):
+        granja = self.get_object()
+        if granja.lotes.exists():
+            return response.Response(
+                {'detail': 'Não é permitido excluir granja com lotes.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().destroy(request, *args, **kwargs)
 
 
 # ----------------- Lotes -----------------
 
-class LoteViewSet(viewsets.ModelViewSet):
+LOTE_ATIVO_EXISTENTE = 'Já existe um lote ativo. Finalize-o antes de criar outro.'
+
+
+class LoteViewSet(ReplicaMixin, GranjaMixin, viewsets.ModelViewSet):
     queryset = Lote.objects.all().order_by('-criado_em')
     serializer_class = LoteSerializer
-
-    def _build_resumo_payload(self, lote: Lote):
-        # --- básicos ---
-        total_chegadas = int(Chegada.objects.filter(lote=lote).aggregate(s=Sum('quantidade'))['s'] or 0)
-        total_mortes = int(Morte.objects.filter(lote=lote).count() or 0)
-        total_saidas_qtd = int(Saida.objects.filter(lote=lote).aggregate(s=Sum('quantidade'))['s'] or 0)
-
-        suinos_atuais = max(total_chegadas - total_mortes, 0)
-        status_txt = 'Em andamento' if lote.ativo else 'Finalizado'
-
-        # --- ração (assumindo kg em RacaoEntrada.quantidade) ---
-        consumo_total_racao = _f(
-            RacaoEntrada.objects.filter(lote=lote).aggregate(s=Sum('quantidade'))['s'],
-            3
-        ) or 0.0
-
-        # --- pesos de chegada ---
-        # Somatório do peso de chegada: usa peso_total quando houver; senão, quantidade * peso_medio
-        peso_chegada_total = 0.0
-        for c in Chegada.objects.filter(lote=lote).values('quantidade', 'peso_medio', 'peso_total'):
-            q = int(c['quantidade'] or 0)
-            if c['peso_total'] is not None:
-                peso_chegada_total += _f(c['peso_total']) or 0.0
-            else:
-                peso_chegada_total += q * (_f(c['peso_medio']) or 0.0)
-
-        # --- pesos de saída ---
-        peso_saida_total = _f(Saida.objects.filter(lote=lote).aggregate(s=Sum('peso_total'))['s']) or 0.0
-
-        # --- médias de pesos que precisamos expor ---
-        peso_medio_chegadas = _safe_div(peso_chegada_total, total_chegadas, 3)
-        peso_medio_saidas   = _safe_div(peso_saida_total,   total_saidas_qtd, 3)
-
-        ganho_peso_total = max(peso_saida_total - peso_chegada_total, 0.0)
-        ganho_peso_por_cabeca = None
-        if (peso_medio_chegadas is not None) and (peso_medio_saidas is not None):
-            ganho_peso_por_cabeca = round(peso_medio_saidas - peso_medio_chegadas, 3)
-
-        # --- datas médias ponderadas por quantidade (chegada/saída) ---
-        # chegada
-        chegadas_dt = Chegada.objects.filter(lote=lote).values('data', 'quantidade')
-        soma_w_chegada, soma_q_chegada = 0, 0
-        for r in chegadas_dt:
-            ordv = _date_to_ordinal(r['data'])
-            q = int(r['quantidade'] or 0)
-            if ordv and q > 0:
-                soma_w_chegada += ordv * q
-                soma_q_chegada += q
-        data_media_chegada = date.fromordinal(int(round(soma_w_chegada / soma_q_chegada))) if soma_q_chegada > 0 else None
-
-        # saída
-        saidas_dt = Saida.objects.filter(lote=lote).values('data', 'quantidade')
-        soma_w_saida, soma_q_saida = 0, 0
-        for r in saidas_dt:
-            ordv = _date_to_ordinal(r['data'])
-            q = int(r['quantidade'] or 0)
-            if ordv and q > 0:
-                soma_w_saida += ordv * q
-                soma_q_saida += q
-        data_media_saida = date.fromordinal(int(round(soma_w_saida / soma_q_saida))) if soma_q_saida > 0 else None
-
-        # --- dias de alojamento ---
-        # Para lote ativo: hoje - data_media_chegada
-        # Para lote finalizado: data_media_saida - data_media_chegada (se não houver saída, usa finalizado_em; na falta, hoje)
-        hoje = timezone.localdate()
-        if data_media_chegada:
-            if lote.ativo:
-                limite = hoje
-            else:
-                limite = data_media_saida or (_to_date(lote.finalizado_em) or hoje)
-            dias_alojamento = max((limite - data_media_chegada).days, 0)
-        else:
-            dias_alojamento = 0
-
-        # --- derivados adicionais (usados em várias telas) ---
-        conversao_alimentar = _safe_div(consumo_total_racao, ganho_peso_total, 4)
-        percentual_mortalidade = round((total_mortes / total_chegadas) * 100.0, 2) if total_chegadas > 0 else 0.0
-
-        # Consumo por dia / por cabeça podem continuar sendo enviados (o frontend decide exibir ou não)
-        consumo_por_dia = _safe_div(consumo_total_racao, dias_alojamento, 3)
-        cabecas_media = ((total_chegadas + suinos_atuais) / 2) if (total_chegadas + suinos_atuais) > 0 else 0
-        consumo_por_dia_por_cabeca = _safe_div(consumo_total_racao, dias_alojamento * cabecas_media, 4)
-
-        # Último peso médio registrado (de chegada) - útil para algumas telas
-        ultima = Chegada.objects.filter(lote=lote).order_by('-data', '-id').first()
-        peso_ult = _f(ultima.peso_medio) if ultima else None
-
-        return {
-            # Identificação/estado
-            'lote_id': lote.id,
-            'nome': lote.nome,
-            'status': status_txt,
-
-            # Quantidades e eventos
-            'total_chegadas': total_chegadas,
-            'total_mortes': total_mortes,
-            'suinos_em_andamento': suinos_atuais,
-
-            # Pesos (chegadas/saídas)
-            'peso_medio_ult_chegada': peso_ult,     # opcional/legado
-            'peso_medio_chegadas': peso_medio_chegadas,
-            'peso_medio_saidas':   peso_medio_saidas,
-            'ganho_peso_por_cabeca': ganho_peso_por_cabeca,
-
-            # Datas e alojamento
-            'dias_alojamento': dias_alojamento,
-            'data_media_chegada': data_media_chegada.isoformat() if data_media_chegada else None,
-            'data_media_saida':   data_media_saida.isoformat() if data_media_saida else None,
-
-            # Ração e conversão
-            'consumo_total_racao': consumo_total_racao,
-            'consumo_por_dia': consumo_por_dia,
-            'consumo_por_dia_por_cabeca': consumo_por_dia_por_cabeca,
-            'conversao_alimentar': conversao_alimentar,
-
-            # Mortalidade
-            'percentual_mortalidade': percentual_mortalidade,
-        }
+    granja_lookup = 'granja'
+    replica_actions = ('list', 'retrieve', 'resumo', 'resumo_ativo', 'finalizados', 'historico')
 
     # ---------- /api/lotes/{id}/resumo/ ----------
     @decorators.action(detail=True, methods=['get'])
     def resumo(self, request, pk=None):
         lote = self.get_object()
-        return response.Response(self._build_resumo_payload(lote))
+        return response.Response(build_resumo_payload(lote))
+
+    # ---------- /api/lotes/{id}/projecao/?data=YYYY-MM-DD&peso_alvo=KG ----------
+    @decorators.action(detail=True, methods=['get'])
+    def projecao(self, request, pk=None):
+        lote = self.get_object()
+        try:
+            data_ref = parse_date(request.query_params.get('data') or '') or timezone.localdate()
+            peso_alvo = float(request.query_params.get('peso_alvo') or settings.PESO_ABATE_ALVO)
+        except ValueError:
+            return response.Response({'detail': 'Parâmetros inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not math.isfinite(peso_alvo) or peso_alvo <= 0:
+            return response.Response({'detail': 'Informe um peso alvo positivo.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            payload = projetar(lote, data_ref, peso_alvo)
+        except OverflowError:
+            # data prevista de abate além do que um date representa
+            return response.Response(
+                {'detail': 'Peso alvo fora do alcance da curva de crescimento.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if payload is None:
+            return response.Response(
+                {'detail': 'Histórico insuficiente para projeção.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return response.Response(payload)
+
+    # ---------- /api/lotes/{id}/historico/[?em=YYYY-MM-DDTHH:MM | ?cursor=&limite=] ----------
+    @decorators.action(detail=True, methods=['get'])
+    def historico(self, request, pk=None):
+        lote = self.get_object()
+        em = request.query_params.get('em')
+        if not em:
+            registros = HistoricoEvento.objects.filter(lote_id=lote.pk)
+            paginador = HistoricoPaginacao()
+            pagina = paginador.paginate_queryset(registros, request, view=self)
+            return paginador.get_paginated_response(HistoricoEventoSerializer(pagina, many=True).data)
+
+        try:
+            instante = parse_datetime(em)
+        except ValueError:  # bem formada, mas impossível (ex.: mês 13)
+            instante = None
+        if instante is None:
+            return response.Response({'detail': 'Data/hora inválida.'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(instante):
+            instante = timezone.make_aware(instante)
+        return response.Response({'lote_id': lote.pk, 'em': instante, **historico_em(lote, instante)})
 
     # ---------- /api/lotes/ativo/resumo/ ----------
     @decorators.action(detail=False, methods=['get'], url_path='ativo/resumo')
     def resumo_ativo(self, request):
-        lote = Lote.objects.filter(ativo=True).order_by('-criado_em').first()
+        lote = Lote.objects.ativo(self.get_granja())
         if not lote:
             return response.Response({'detail': 'Nenhum lote ativo.'}, status=status.HTTP_404_NOT_FOUND)
-        return response.Response(self._build_resumo_payload(lote))
+        return response.Response(build_resumo_payload(lote))
 
     # ---------- /api/lotes/ativo/ ----------
     @decorators.action(detail=False, methods=['get'], url_path='ativo')
     def ativo(self, request):
-        lote = Lote.objects.filter(ativo=True).order_by('-criado_em').first()
+        lote = Lote.objects.ativo(self.get_granja())
         if not lote:
             return response.Response({'detail': 'Nenhum lote ativo.'}, status=status.HTTP_404_NOT_FOUND)
         return response.Response(LoteSerializer(lote).data)
@@ -230,7 +318,7 @@ class LoteViewSet(viewsets.ModelViewSet):
     # ---------- /api/lotes/finalizados/ ----------
     @decorators.action(detail=False, methods=['get'], url_path='finalizados')
     def finalizados(self, request):
-        qs = Lote.objects.filter(ativo=False).order_by('-finalizado_em', '-criado_em')
+        qs = self.get_queryset().filter(ativo=False).order_by('-finalizado_em', '-criado_em')
         return response.Response(LoteSerializer(qs, many=True).data)
 
     # ---------- /api/lotes/criar_ativo/ ----------
@@ -239,26 +327,51 @@ class LoteViewSet(viewsets.ModelViewSet):
         nome = (request.data.get('nome') or '').strip()
         if not nome:
             return response.Response({'detail': 'Informe o nome.'}, status=status.HTTP_400_BAD_REQUEST)
-        if Lote.objects.filter(ativo=True).exists():
-            return response.Response(
-                {'detail': 'Já existe um lote ativo. Finalize-o antes de criar outro.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        lote = Lote.objects.create(nome=nome, ativo=True)
+        granja = self.get_granja()
+        # a constraint unico_lote_ativo_por_granja garante a regra mesmo com requisições simultâneas
+        try:
+            with transaction.atomic():
+                if Lote.objects.select_for_update().filter(granja=granja, ativo=True).first():
+                    return response.Response({'detail': LOTE_ATIVO_EXISTENTE}, status=status.HTTP_400_BAD_REQUEST)
+                lote = Lote.objects.create(granja=granja, nome=nome, ativo=True)
+        except IntegrityError:
+            return response.Response({'detail': LOTE_ATIVO_EXISTENTE}, status=status.HTTP_400_BAD_REQUEST)
         return response.Response(LoteSerializer(lote).data, status=status.HTTP_201_CREATED)
 
     # ---------- /api/lotes/finalizar_ativo/ ----------
     @decorators.action(detail=False, methods=['post'], url_path='finalizar_ativo')
     def finalizar_ativo(self, request):
-        lote = Lote.objects.filter(ativo=True).order_by('-criado_em').first()
-        if not lote:
-            return response.Response({'detail': 'Nenhum lote ativo.'}, status=status.HTTP_404_NOT_FOUND)
-        lote.ativo = False
-        # timezone.now() é aware; evita warnings/erros de naive datetime
-        lote.finalizado_em = timezone.now()
-        lote.save(update_fields=['ativo', 'finalizado_em'])
+        with transaction.atomic():
+            lote = (
+                Lote.objects.select_for_update()
+                .filter(granja=self.get_granja(), ativo=True)
+                .order_by('-criado_em')
+                .first()
+            )
+            if not lote:
+                return response.Response({'detail': 'Nenhum lote ativo.'}, status=status.HTTP_404_NOT_FOUND)
+            lote.ativo = False
+            # timezone.now() é aware; evita warnings/erros de naive datetime
+            lote.finalizado_em = timezone.now()
+            lote.save(update_fields=['ativo', 'finalizado_em'])
+            # curva de crescimento da granja recebe o lote sem refazer o histórico
+            incorporar_lote(lote)
         return response.Response(LoteSerializer(lote).data)
 
+    # ---------- POST/PUT/PATCH /api/lotes/ ----------
+    def perform_create(self, serializer):
+        self._salvar_sem_conflito(serializer)
+
+    def perform_update(self, serializer):
+        self._salvar_sem_conflito(serializer)
+
+    def _salvar_sem_conflito(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save(granja=self.get_granja())
+        except IntegrityError:
+            raise exceptions.ValidationError({'detail': LOTE_ATIVO_EXISTENTE})
+
     # ---------- DELETE /api/lotes/{id}/ ----------
     def destroy(self, request, *args, **kwargs):
         lote = self.get_object()
@@ -267,14 +380,17 @@ class LoteViewSet(viewsets.ModelViewSet):
                 {'detail': 'Não é permitido excluir lote ativo.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        return super().destroy(request, *args, **kwargs)
+        resp = super().destroy(request, *args, **kwargs)
+        descartar_curva(lote.granja_id)
+        return resp
 
 
 # ----------------- Chegadas -----------------
 
-class ChegadaViewSet(viewsets.ModelViewSet):
+class ChegadaViewSet(ReplicaMixin, ArquivoListMixin, FastListMixin, AuditoriaMixin, GranjaMixin, EventoLoteMixin, viewsets.ModelViewSet):
     queryset = Chegada.objects.all().order_by('-data', '-id')
     serializer_class = ChegadaSerializer
+    arquivo_chave = 'chegadas'
 
     # /api/chegadas/?lote=ID
     def get_queryset(self):
@@ -285,9 +401,10 @@ class ChegadaViewSet(viewsets.ModelViewSet):
 
 # ----------------- Mortes -----------------
 
-class MorteViewSet(viewsets.ModelViewSet):
+class MorteViewSet(ReplicaMixin, ArquivoListMixin, FastListMixin, AuditoriaMixin, GranjaMixin, EventoLoteMixin, viewsets.ModelViewSet):
     queryset = Morte.objects.all().order_by('-data_morte', '-id')
     serializer_class = MorteSerializer
+    arquivo_chave = 'mortes'
 
     # /api/mortes/?lote=ID
     def get_queryset(self):
@@ -298,7 +415,7 @@ class MorteViewSet(viewsets.ModelViewSet):
 
 # ----------------- Observações -----------------
 
-class ObservacaoViewSet(viewsets.ModelViewSet):
+class ObservacaoViewSet(ReplicaMixin, FastListMixin, GranjaMixin, viewsets.ModelViewSet):
     queryset = Observacao.objects.all().order_by('-criado_em')
     serializer_class = ObservacaoSerializer
 
@@ -311,9 +428,10 @@ class ObservacaoViewSet(viewsets.ModelViewSet):
 
 # ----------------- Ração -----------------
 
-class RacaoEntradaViewSet(viewsets.ModelViewSet):
+class RacaoEntradaViewSet(ReplicaMixin, ArquivoListMixin, FastListMixin, AuditoriaMixin, GranjaMixin, viewsets.ModelViewSet):
     queryset = RacaoEntrada.objects.all().order_by('-data', '-id')
     serializer_class = RacaoEntradaSerializer
+    arquivo_chave = 'racoes'
 
     # /api/racoes/?lote=ID
     def get_queryset(self):
@@ -324,9 +442,10 @@ class RacaoEntradaViewSet(viewsets.ModelViewSet):
 
 # ----------------- Saídas -----------------
 
-class SaidaViewSet(viewsets.ModelViewSet):
+class SaidaViewSet(ReplicaMixin, ArquivoListMixin, FastListMixin, AuditoriaMixin, GranjaMixin, EventoLoteMixin, viewsets.ModelViewSet):
     queryset = Saida.objects.all().order_by('-data', '-id')
     serializer_class = SaidaSerializer
+    arquivo_chave = 'saidas'
 
     # /api/saidas/?lote=ID
     def get_queryset(self):